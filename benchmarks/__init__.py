@@ -0,0 +1 @@
+"""Benchmarks for the Sentinel deployment paths"""
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark for batch modeling of rule templates.
+
+Compares the per-item if/elif constructor loop with the discriminated
+union TypeAdapter in src.rule_batch, on a clean catalog and on one where
+a share of the templates is invalid.
+
+Usage (from the repository root):
+
+    python -m benchmarks.batch_validation --rules 2000 --invalid 0.05
+"""
+
+import argparse
+import copy
+import random
+import time
+
+import benchmarks.content as bc
+import src.nrt_rule_template as nrt
+import src.rule_batch as rb
+import src.scheduled_rule_template as srt
+
+# pylint: disable=W0718
+
+
+def per_item(templates: list[dict]) -> int:
+    """The per-rule constructor loop the batch API replaces"""
+    modeled = []
+    for rule in templates:
+        try:
+            if rule["kind"] == "NRT":
+                modeled.append(nrt.NrtRuleTemplate(**rule))
+            elif rule["kind"] == "Scheduled":
+                modeled.append(srt.ScheduledAlertRuleTemplate(**rule))
+        except Exception:
+            continue
+    return len(modeled)
+
+
+def batch(templates: list[dict]) -> int:
+    """One call through the prebuilt discriminated union validator"""
+    return len(rb.validate_templates(templates).models)
+
+
+def make_catalog(count: int, invalid: float) -> list[dict]:
+    """Raw rule templates with `invalid` share of broken ones"""
+    rng = random.Random(1)
+    templates = [
+        t["properties"]["mainTemplate"]["resources"][0]
+        for t in bc.make_content_templates(count)
+    ]
+    for template in rng.sample(templates, int(count * invalid)):
+        del template["properties"]["query"]
+    return templates
+
+
+def best_of(func, templates: list[dict], repeat: int) -> tuple[float, int]:
+    """Best wall time over `repeat` runs and the number of models built"""
+    timings = []
+    for _ in range(repeat):
+        data = copy.deepcopy(templates)
+        start = time.perf_counter()
+        modeled = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), modeled
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rules", type=int, default=2000)
+    parser.add_argument("--invalid", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for invalid in (0.0, args.invalid):
+        templates = make_catalog(args.rules, invalid)
+        loop_time, loop_count = best_of(per_item, templates, args.repeat)
+        batch_time, batch_count = best_of(batch, templates, args.repeat)
+        if loop_count != batch_count:
+            raise SystemExit(
+                f"Modeled counts differ: {loop_count} vs {batch_count}"
+            )
+        print(
+            f"{invalid:4.0%} invalid, {batch_count} modeled: "
+            f"loop {loop_time * 1000:7.1f} ms, "
+            f"batch {batch_time * 1000:7.1f} ms, "
+            f"{loop_time / batch_time:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Synthetic Sentinel content for benchmarks.
+
+Builds rule templates, content templates and content product packages with
+the same shape and roughly the same size as what the content hub returns,
+so the modeling and serialization layers see realistic volumes.
+"""
+
+import random
+
+TACTICS = [
+    "InitialAccess",
+    "Execution",
+    "Persistence",
+    "PrivilegeEscalation",
+    "DefenseEvasion",
+    "CredentialAccess",
+    "Discovery",
+    "LateralMovement",
+    "Collection",
+    "Exfiltration",
+    "CommandAndControl",
+    "Impact",
+]
+
+TABLES = [
+    "SigninLogs",
+    "AuditLogs",
+    "AzureActivity",
+    "SecurityEvent",
+    "OfficeActivity",
+    "CommonSecurityLog",
+    "DeviceProcessEvents",
+    "AADNonInteractiveUserSignInLogs",
+]
+
+CONNECTORS = [
+    "AzureActiveDirectory",
+    "AzureActivity",
+    "SecurityEvents",
+    "Office365",
+    "CEF",
+    "MicrosoftThreatProtection",
+]
+
+ENTITY_MAPPINGS = [
+    {
+        "entityType": "Account",
+        "fieldMappings": [
+            {"identifier": "FullName", "columnName": "UserPrincipalName"},
+            {"identifier": "Name", "columnName": "AccountName"},
+            {"identifier": "UPNSuffix", "columnName": "AccountUPNSuffix"},
+        ],
+    },
+    {
+        "entityType": "IP",
+        "fieldMappings": [{"identifier": "Address", "columnName": "IPAddress"}],
+    },
+    {
+        "entityType": "Host",
+        "fieldMappings": [{"identifier": "HostName", "columnName": "Computer"}],
+    },
+]
+
+
+def make_query(rng: random.Random, table: str, lines: int) -> str:
+    """Build a multi-line KQL query of roughly `lines` lines"""
+    body = [
+        f"let lookback = {rng.randint(1, 14)}d;",
+        f"let threshold = {rng.randint(1, 50)};",
+        table,
+        "| where TimeGenerated > ago(lookback)",
+    ]
+    for i in range(lines):
+        body.append(
+            f"| extend Field{i} = tostring(parse_json(AdditionalDetails)"
+            f"[{i}].value)  // detail column {i}"
+        )
+    body.extend(
+        [
+            "| summarize Count = count(), StartTime = min(TimeGenerated), "
+            "EndTime = max(TimeGenerated) by UserPrincipalName, IPAddress, "
+            "Computer",
+            "| where Count > threshold",
+            "| extend AccountName = tostring(split(UserPrincipalName, '@')[0])",
+            "| extend AccountUPNSuffix = "
+            "tostring(split(UserPrincipalName, '@')[1])",
+        ]
+    )
+    return "\n".join(body)
+
+
+def make_rule_template(rng: random.Random, index: int) -> dict:
+    """Build one ARM alertRuleTemplate resource as found in a mainTemplate"""
+    kind = "NRT" if index % 5 == 0 else "Scheduled"
+    table = rng.choice(TABLES)
+    techniques = [
+        f"T{rng.randint(1000, 1600)}"
+        + (f".{rng.randint(1, 9):03d}" if rng.random() < 0.4 else "")
+        for _ in range(rng.randint(1, 4))
+    ]
+    properties = {
+        "displayName": f"Benchmark rule {index} on {table}",
+        "description": "Synthetic detection used for benchmarking. " * 6,
+        "severity": rng.choice(["High", "Medium", "Low", "Informational"]),
+        "query": make_query(rng, table, rng.randint(10, 60)),
+        "tactics": rng.sample(TACTICS, rng.randint(1, 3)),
+        "techniques": techniques,
+        "entityMappings": ENTITY_MAPPINGS,
+        "requiredDataConnectors": [
+            {"connectorId": rng.choice(CONNECTORS), "dataTypes": [table]}
+        ],
+        "status": "Available",
+        "version": f"1.0.{rng.randint(0, 9)}",
+    }
+    if kind == "Scheduled":
+        properties.update(
+            {
+                "queryFrequency": rng.choice(["5m", "1h", "PT1H", "1d"]),
+                "queryPeriod": rng.choice(["1h", "1d", "P1D", "14d"]),
+                "triggerOperator": rng.choice(["gt", "GreaterThan", "eq"]),
+                "triggerThreshold": rng.randint(0, 5),
+            }
+        )
+    return {
+        "type": "Microsoft.OperationalInsights/workspaces/providers/"
+        "alertRuleTemplates",
+        "name": f"bench-template-{index:05d}",
+        "kind": kind,
+        "properties": properties,
+    }
+
+
+def make_content_templates(count: int, seed: int = 0) -> list[dict]:
+    """Build `count` AnalyticsRule contentTemplates with expanded mainTemplate"""
+    rng = random.Random(seed)
+    templates = []
+    for index in range(count):
+        rule = make_rule_template(rng, index)
+        templates.append(
+            {
+                "id": f"/contentTemplates/bench-{index:05d}",
+                "name": f"bench-{index:05d}",
+                "type": "Microsoft.SecurityInsights/contentTemplates",
+                "properties": {
+                    "contentId": rule["name"],
+                    "contentKind": "AnalyticsRule",
+                    "displayName": rule["properties"]["displayName"],
+                    "version": rule["properties"]["version"],
+                    "mainTemplate": {
+                        "$schema": "https://schema.management.azure.com/"
+                        "schemas/2019-04-01/deploymentTemplate.json#",
+                        "contentVersion": rule["properties"]["version"],
+                        "resources": [rule],
+                    },
+                },
+            }
+        )
+    return templates
+
+
+def make_product_package(name: str, size_mb: float, seed: int = 0) -> dict:
+    """Build a content product package with a packagedContent of ~size_mb"""
+    rng = random.Random(seed)
+    resources = []
+    size = 0
+    index = 0
+    while size < size_mb * 1024 * 1024:
+        rule = make_rule_template(rng, index)
+        resources.append(
+            {
+                "type": "Microsoft.OperationalInsights/workspaces/providers/"
+                "contentTemplates",
+                "name": f"{name}-content-{index}",
+                "properties": {
+                    "contentId": rule["name"],
+                    "mainTemplate": {
+                        "metadata": {"postDeployment": ["Configure it"]},
+                        "resources": [rule],
+                    },
+                },
+            }
+        )
+        size += len(rule["properties"]["query"]) + 2048
+        index += 1
+    return {
+        "id": f"/contentProductPackages/{name}",
+        "name": name,
+        "properties": {
+            "displayName": name,
+            "contentKind": "Solution",
+            "packagedContent": {
+                "$schema": "https://schema.management.azure.com/schemas/"
+                "2019-04-01/deploymentTemplate.json#",
+                "contentVersion": "1.0.0",
+                "resources": resources,
+            },
+        },
+    }
+
+
+def make_product_packages(
+    count: int, size_mb: float, seed: int = 0
+) -> list[dict]:
+    """Build `count` content product packages of ~size_mb each"""
+    return [
+        make_product_package(f"Benchmark Solution {i}", size_mb, seed + i)
+        for i in range(count)
+    ]
@@ -0,0 +1,233 @@
+"""
+End-to-end deploy throughput benchmark.
+
+Drives ``create_sentinel_workspace``, ``full_solution_deploy`` and
+``deploy_alert_rules``, batched and streamed (``stream=True``, as the
+rules deployment task runs it), against a local mock ARM endpoint and
+reports, per phase, wall and CPU time, peak RSS, request count, p50/p99
+request latency and (for rules) rules/sec. Each phase runs in a fresh
+process so peak RSS and CPU time belong to that phase only; the mock
+server runs in its own process so its work is not counted.
+
+Usage (from the repository root):
+
+    python -m benchmarks.deploy_throughput --rules 500 --package-mb 4
+    python -m benchmarks.deploy_throughput --save-baseline
+    python -m benchmarks.deploy_throughput --compare
+
+``--compare`` exits non-zero when a metric regresses past ``--tolerance``
+relative to the saved baseline.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import benchmarks.mock_arm as ma
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+PHASES = (
+    "create_sentinel_workspace",
+    "full_solution_deploy",
+    "deploy_rules",
+    "deploy_rules_streamed",
+)
+# metric name -> True when larger values are better
+METRICS = {
+    "wall_s": False,
+    "cpu_s": False,
+    "peak_rss_mb": False,
+    "p50_ms": False,
+    "p99_ms": False,
+    "rules_per_sec": True,
+}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile, 0.0 for an empty sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _instrument_requests(latencies: list, methods: list):
+    """Record the latency of every request made through `requests`"""
+    import requests
+
+    original = requests.sessions.Session.request
+
+    def timed(session, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(session, method, url, *args, **kwargs)
+        finally:
+            latencies.append((time.perf_counter() - start) * 1000)
+            methods.append((method.upper(), url))
+
+    requests.sessions.Session.request = timed
+
+
+def run_phase(
+    phase: str,
+    url: str,
+    package_names: list,
+    workspaces: int,
+    verbose: bool,
+) -> dict:
+    """Run one phase in the current (fresh) process and return its metrics"""
+    import src.app_logging as al
+    from src.sentinel_workspace import SentinelWorkspace
+
+    if not verbose:
+        al.logger.setLevel(logging.WARNING)
+    latencies, methods = [], []
+    _instrument_requests(latencies, methods)
+
+    def workspace(rg_name: str, ws_name: str) -> SentinelWorkspace:
+        return SentinelWorkspace(
+            sub_id="00000000-0000-0000-0000-000000000000",
+            rg_name=rg_name,
+            ws_name=ws_name,
+            access_token="benchmark",
+            management_url=url,
+        )
+
+    ws = workspace("rg-bench", "ws-bench")
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    if phase == "create_sentinel_workspace":
+        for i in range(workspaces):
+            # URLs are built in __init__, so each target needs its own client
+            target = workspace(f"rg-bench-{i}", f"ws-bench-{i}")
+            target.create_sentinel_workspace("eastus")
+    elif phase == "full_solution_deploy":
+        ws.deploy_solutions("eastus", package_names)
+    elif phase == "deploy_rules":
+        ws.deploy_rules()
+    elif phase == "deploy_rules_streamed":
+        ws.deploy_rules(stream=True)
+    else:
+        raise ValueError(f"Unknown phase: {phase}")
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    rule_puts = sum(
+        1 for method, u in methods if method == "PUT" and "/alertRules/" in u
+    )
+    return {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "rules_per_sec": round(rule_puts / wall, 1) if rule_puts else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List metrics that regressed more than `tolerance` vs the baseline"""
+    regressions = []
+    for phase, metrics in results.items():
+        for name, higher_is_better in METRICS.items():
+            old = baseline.get(phase, {}).get(name)
+            new = metrics.get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if higher_is_better:
+                change = -change
+            if change > tolerance:
+                regressions.append(
+                    f"{phase}.{name}: {old} -> {new} ({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--packages", type=int, default=3)
+    parser.add_argument("--package-mb", type=float, default=4.0)
+    parser.add_argument("--workspaces", type=int, default=25)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--phase", choices=PHASES, action="append")
+    parser.add_argument("--baseline", default="deploy_throughput")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, stop = ctx.Queue(), ctx.Event()
+    server = ctx.Process(
+        target=ma.serve,
+        args=(
+            {
+                "rule_count": args.rules,
+                "package_count": args.packages,
+                "package_mb": args.package_mb,
+                "latency_ms": args.latency_ms,
+            },
+            ready,
+            stop,
+        ),
+        daemon=True,
+    )
+    server.start()
+    url, package_names = ready.get(timeout=600)
+
+    results = {}
+    try:
+        for phase in args.phase or PHASES:
+            with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                results[phase] = pool.submit(
+                    run_phase,
+                    phase,
+                    url,
+                    package_names,
+                    args.workspaces,
+                    args.verbose,
+                ).result()
+            print(f"{phase}: {json.dumps(results[phase])}")
+    finally:
+        stop.set()
+        server.join(timeout=10)
+
+    baseline_path = BASELINE_DIR / f"{args.baseline}.json"
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(
+            json.dumps(results, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"Baseline saved to {baseline_path}")
+    if args.compare:
+        if not baseline_path.exists():
+            print(f"No baseline at {baseline_path}")
+            return 2
+        regressions = compare(
+            results,
+            json.loads(baseline_path.read_text(encoding="utf-8")),
+            args.tolerance,
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Local mock of the Azure Resource Manager endpoints used by SentinelWorkspace.
+
+Serves the content listings from benchmarks.content and accepts every PUT,
+so the client side (transport, modeling and serialization) can be measured
+without touching Azure. Point a SentinelWorkspace at it with
+``management_url=server.url``.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, unquote
+
+import benchmarks.content as bc
+
+# pylint: disable=C0103
+
+
+class MockArmState:
+    """Pre-serialized responses shared by all request handlers"""
+
+    def __init__(
+        self,
+        rule_count: int,
+        package_count: int,
+        package_mb: float,
+        latency_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        templates = bc.make_content_templates(rule_count, seed)
+        packages = bc.make_product_packages(package_count, package_mb, seed)
+        self.latency = latency_ms / 1000
+        self.content_templates = json.dumps({"value": templates}).encode()
+        self.templates = {t["name"]: json.dumps(t).encode() for t in templates}
+        self.package_list = json.dumps(
+            {
+                "value": [
+                    {
+                        "id": p["id"],
+                        "name": p["name"],
+                        "properties": {
+                            "displayName": p["properties"]["displayName"],
+                            "contentKind": "Solution",
+                        },
+                    }
+                    for p in packages
+                ]
+            }
+        ).encode()
+        self.packages = {p["name"]: json.dumps(p).encode() for p in packages}
+        self.package_names = [p["name"] for p in packages]
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+
+
+class MockArmHandler(BaseHTTPRequestHandler):
+    """Routes ARM paths to canned responses"""
+
+    protocol_version = "HTTP/1.1"
+    state: MockArmState = None
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """Silence per-request logging"""
+
+    def _send(self, status: int, body: bytes = b""):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        with self.state.lock:
+            self.state.requests += 1
+            self.state.bytes_received += len(body)
+        return body
+
+    def do_GET(self):
+        """Serve content listings"""
+        self._read_body()
+        path = unquote(urlsplit(self.path).path)
+        segments = path.rstrip("/").split("/")
+        if segments[-1] == "contentTemplates":
+            return self._send(200, self.state.content_templates)
+        if len(segments) > 1 and segments[-2] == "contentTemplates":
+            body = self.state.templates.get(segments[-1])
+            return self._send(200 if body else 404, body or b"")
+        if segments[-1] == "alertRules":
+            return self._send(200, b'{"value": []}')
+        if segments[-1] == "contentProductPackages":
+            return self._send(200, self.state.package_list)
+        if len(segments) > 1 and segments[-2] == "contentProductPackages":
+            body = self.state.packages.get(segments[-1])
+            return self._send(200 if body else 404, body or b"")
+        return self._send(404)
+
+    def do_PUT(self):
+        """Accept any resource creation and echo a provisioned resource"""
+        body = self._read_body()
+        path = unquote(urlsplit(self.path).path)
+        try:
+            json.loads(body or b"{}")
+        except ValueError:
+            return self._send(400, b'{"error": "invalid JSON body"}')
+        response = {
+            "id": path,
+            "name": path.rstrip("/").rsplit("/", 1)[-1],
+            "properties": {"provisioningState": "Succeeded"},
+        }
+        return self._send(200, json.dumps(response).encode())
+
+    def do_PATCH(self):
+        """Same as PUT"""
+        return self.do_PUT()
+
+    def do_DELETE(self):
+        """Accept any delete"""
+        self._read_body()
+        return self._send(200)
+
+
+class MockArmHTTPServer(ThreadingHTTPServer):
+    """
+    Threading server with a listen backlog deep enough for concurrent
+    clients opening a connection per request; the default of 5 drops
+    connections into a one second SYN retry
+    """
+
+    request_queue_size = 128
+
+
+class MockArmServer:
+    """Runs a MockArmHandler server on a background thread"""
+
+    def __init__(self, state: MockArmState, host: str = "127.0.0.1"):
+        handler = type("BoundHandler", (MockArmHandler,), {"state": state})
+        self.state = state
+        self.httpd = MockArmHTTPServer((host, 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, name="mock-arm", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as management_url"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def serve(state_kwargs: dict, ready, stop):
+    """Process entry point: serve until `stop` is set, report URL via `ready`"""
+    with MockArmServer(MockArmState(**state_kwargs)) as server:
+        ready.put((server.url, server.state.package_names))
+        stop.wait()
@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for the template -> rule conversion path.
+
+Compares the two-pass path (model the template, dump it, validate it again
+as a rule) with the single-validation fast path, and checks both produce
+the same PUT body.
+
+Usage (from the repository root):
+
+    python -m benchmarks.template_conversion --rules 500 --repeat 5
+"""
+
+import argparse
+import copy
+import logging
+import time
+
+import benchmarks.content as bc
+import src.app_logging as al
+import src.deploy_rules as dr
+import src.template_to_rule as ttr
+
+
+def two_pass(templates: list[dict]):
+    """Original path: template model -> dump -> rule model"""
+    return ttr.translate_templates_to_rules(
+        dr.model_templates_for_deployment(templates)
+    )
+
+
+def fast_path(templates: list[dict]):
+    """Raw template dict -> rule model, validated once"""
+    return ttr.rules_from_template_dicts(templates)
+
+
+def comparable(body):
+    """Drop empty values and order string lists so bodies can be compared"""
+    if isinstance(body, dict):
+        return {
+            k: comparable(v) for k, v in body.items() if v not in (None, [])
+        }
+    if isinstance(body, list):
+        items = [comparable(v) for v in body]
+        return (
+            sorted(items) if all(isinstance(v, str) for v in items) else items
+        )
+    return body
+
+
+def best_of(func, templates: list[dict], repeat: int) -> float:
+    """Best wall time over `repeat` runs, on fresh copies of the input"""
+    timings = []
+    for _ in range(repeat):
+        data = copy.deepcopy(templates)
+        start = time.perf_counter()
+        func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    al.logger.setLevel(logging.WARNING)
+
+    templates = [
+        t["properties"]["mainTemplate"]["resources"][0]
+        for t in bc.make_content_templates(args.rules)
+    ]
+    bodies = [
+        [
+            comparable(rule.model_dump())
+            for rule in func(copy.deepcopy(templates))
+        ]
+        for func in (two_pass, fast_path)
+    ]
+    if bodies[0] != bodies[1]:
+        raise SystemExit("Conversion paths produced different rule bodies")
+
+    baseline = None
+    for func in (two_pass, fast_path):
+        elapsed = best_of(func, templates, args.repeat)
+        baseline = baseline or elapsed
+        print(
+            f"{func.__name__:>12}: {elapsed * 1000:8.1f} ms total, "
+            f"{elapsed / args.rules * 1e6:7.1f} us/rule, "
+            f"{baseline / elapsed:4.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,11 @@ from flask import (
     redirect,
     url_for,
     session,
+    jsonify,
 )
 from src.app_logging import logger
-from services.sentinel import deploy_rules_task
+from services.sentinel import deploy_rules_task, fleet_deploy_rules_task
+from blueprints.workspace import has_credentials
 
 # pylint: disable=W1203
 
@@ -21,6 +23,64 @@ deploy_rules_bp = Blueprint("deploy_rules", __name__)
 rule_deployments = {}
 
 
+RULE_FILTER_FIELDS = ("tactics", "techniques", "connectors", "data_types")
+# Upper bounds for the concurrency options of a fleet deployment
+MAX_FLEET_WORKERS = 32
+MAX_PER_SUBSCRIPTION = 8
+
+
+def _rule_filters(form) -> dict:
+    """Rule index filters from the deploy rules prompt form."""
+    filters = {}
+    for field in RULE_FILTER_FIELDS:
+        values = [v.strip() for v in form.get(field, "").split(",")]
+        if any(values):
+            filters[field] = [v for v in values if v]
+    if form.getlist("severities"):
+        filters["severities"] = form.getlist("severities")
+    if form.get("text", "").strip():
+        filters["text"] = form["text"].strip()
+    return filters
+
+
+def _valid_targets(targets) -> bool:
+    """Whether fleet targets are a non-empty list of [sub, rg, ws] names"""
+    return (
+        isinstance(targets, list)
+        and bool(targets)
+        and all(
+            isinstance(target, list)
+            and len(target) == 3
+            and all(isinstance(part, str) and part.strip() for part in target)
+            for target in targets
+        )
+    )
+
+
+def _bounded_int(payload: dict, key: str, default: int, maximum: int) -> int:
+    """
+    An integer option of a JSON payload clamped to 1..maximum.
+    Raises ValueError when it is not a whole number.
+    """
+    value = payload.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{key} must be an integer")
+    try:
+        value = int(value)
+    except ValueError as e:
+        raise ValueError(f"{key} must be an integer") from e
+    return min(max(value, 1), maximum)
+
+
+def _coverage_target(form) -> float | None:
+    """ATT&CK coverage target from the prompt form, as a fraction."""
+    try:
+        percent = float(form.get("coverage_target", "").strip())
+    except ValueError:
+        return None
+    return min(percent, 100) / 100 if percent > 0 else None
+
+
 @deploy_rules_bp.route(
     "/deploy_rules_prompt/<source_deployment_id>", methods=["GET", "POST"]
 )
@@ -40,6 +100,9 @@ def prompt_deploy_rules(source_deployment_id):
             "Starting rule deployment thread (triggered from "
             f"{source_deployment_id}) for deployment_id={deployment_id}"
         )
+        filters = _rule_filters(request.form)
+        if filters:
+            logger.info(f"Deploying only rules matching {filters}")
         thread = threading.Thread(
             target=deploy_rules_task,
             args=(
@@ -47,6 +110,11 @@ def prompt_deploy_rules(source_deployment_id):
                 workspace_form,
                 client_secret,
                 rule_deployments,
+                filters,
+                "skip" if request.form.get("skip_missing_sources") else None,
+                "skip" if request.form.get("skip_duplicates") else "report",
+                _coverage_target(request.form),
+                bool(request.form.get("only_changed")),
             ),
         )
         thread.start()
@@ -60,6 +128,80 @@ def prompt_deploy_rules(source_deployment_id):
     )
 
 
+@deploy_rules_bp.route("/fleet_deploy_rules", methods=["POST"])
+def fleet_deploy_rules():
+    """
+    Start deploying rules to many workspaces.
+
+    Expects JSON {"targets": [[subscription_id, resource_group,
+    workspace_name], ...]} and optional "max_workers"/"per_subscription",
+    whole numbers clamped to MAX_FLEET_WORKERS/MAX_PER_SUBSCRIPTION.
+    Credentials come from the session's workspace form.
+    """
+    payload = request.get_json(silent=True) or {}
+    targets = payload.get("targets")
+    if not _valid_targets(targets):
+        return jsonify(error="targets must be a list of [sub, rg, ws]"), 400
+    try:
+        max_workers = _bounded_int(
+            payload, "max_workers", 8, MAX_FLEET_WORKERS
+        )
+        per_subscription = _bounded_int(
+            payload, "per_subscription", 2, MAX_PER_SUBSCRIPTION
+        )
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    workspace_form = session.get("workspace_form") or {}
+    client_secret = session.get("client_secret")
+    if not has_credentials(workspace_form, client_secret):
+        return jsonify(error="Workspace credentials missing"), 400
+    deployment_id = str(uuid.uuid4())
+    rule_deployments[deployment_id] = {
+        "status": "In Progress",
+        "logs": [],
+        "results": [],
+    }
+    logger.info(
+        f"Starting fleet rule deployment to {len(targets)} workspaces "
+        f"for deployment_id={deployment_id}"
+    )
+    thread = threading.Thread(
+        target=fleet_deploy_rules_task,
+        args=(
+            deployment_id,
+            targets,
+            workspace_form,
+            client_secret,
+            rule_deployments,
+        ),
+        kwargs={
+            "max_workers": max_workers,
+            "per_subscription": per_subscription,
+        },
+    )
+    thread.start()
+    return (
+        jsonify(
+            deployment_id=deployment_id,
+            monitor=url_for(
+                "deploy_rules.monitor_rules", deployment_id=deployment_id
+            ),
+        ),
+        202,
+    )
+
+
+@deploy_rules_bp.route("/fleet_results/<deployment_id>")
+def fleet_results(deployment_id):
+    """Per-workspace result matrix of a fleet rule deployment."""
+    deployment = rule_deployments.get(deployment_id)
+    if not deployment:
+        return jsonify(error="Deployment not found"), 404
+    return jsonify(
+        status=deployment["status"], results=deployment.get("results", [])
+    )
+
+
 @deploy_rules_bp.route("/monitor_rules/<deployment_id>")
 def monitor_rules(deployment_id):
     """Monitor the progress of a rule deployment and display status/results."""
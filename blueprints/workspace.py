@@ -57,6 +57,68 @@ def form_no_creds():
     return render_template("form.html", hide_creds=True)
 
 
+def has_credentials(workspace_form, client_secret):
+    """Whether a form and secret are enough to start a deployment."""
+    if not workspace_form:
+        return False
+    # Logged-in users authenticate with their cached token instead
+    return bool(client_secret or workspace_form.get("user_id"))
+
+
+def _owns_deployment(workspace_form, client_secret):
+    """
+    Whether the current session may act with a stored workspace form: the
+    same logged-in user, or the same app registration with its secret.
+    """
+    if workspace_form.get("user_id"):
+        return session.get("user_id") == workspace_form["user_id"]
+    current_form = session.get("workspace_form") or {}
+    return bool(
+        client_secret
+        and workspace_form.get("client_id")
+        and current_form.get("client_id") == workspace_form["client_id"]
+    )
+
+
+def _start_workspace_creation(
+    workspace_form, client_secret, create_rg, create_law, completed_steps=None
+):
+    """Start create_workspace_task in a thread and return its deployment id."""
+    deployment_id = str(uuid.uuid4())
+    # Kept without the secret so a retry resumes against the same workspace
+    deployments[deployment_id] = {
+        "status": "In Progress",
+        "logs": [],
+        "workspace_form": dict(workspace_form),
+        "create_rg": create_rg,
+        "create_law": create_law,
+        "completed_steps": list(completed_steps or []),
+    }
+    logger.info(
+        f"Starting workspace creation thread for deployment_id={deployment_id}"
+    )
+    thread = threading.Thread(
+        target=create_workspace_task,
+        args=(
+            deployment_id,
+            workspace_form["subscription_id"],
+            workspace_form["resource_group"],
+            workspace_form["workspace_name"],
+            workspace_form["region"],
+            workspace_form["client_id"],
+            client_secret,
+            workspace_form["tenant_id"],
+            deployments,
+            workspace_form["user_id"],
+            create_rg,
+            create_law,
+            completed_steps,
+        ),
+    )
+    thread.start()
+    return deployment_id
+
+
 @workspace_bp.route("/create_rg_law", methods=["GET", "POST"])
 def create_rg_law():
     """Ask if resource group and log analytics workspace need to be created.
@@ -72,31 +134,13 @@ def create_rg_law():
         # Otherwise, start workspace creation as before
         workspace_form = session.get("workspace_form")
         client_secret = session.get("client_secret")
+        if not has_credentials(workspace_form, client_secret):
+            return "Workspace credentials missing.", 400
         # pass user id (UID) to worker; worker will read cache from MSAL_CACHE_DIR
 
-        deployment_id = str(uuid.uuid4())
-        deployments[deployment_id] = {"status": "In Progress", "logs": []}
-        logger.info(
-            f"Starting workspace creation thread for deployment_id={deployment_id}"
-        )
-        thread = threading.Thread(
-            target=create_workspace_task,
-            args=(
-                deployment_id,
-                workspace_form["subscription_id"],
-                workspace_form["resource_group"],
-                workspace_form["workspace_name"],
-                workspace_form["region"],
-                workspace_form["client_id"],
-                client_secret,
-                workspace_form["tenant_id"],
-                deployments,
-                workspace_form["user_id"],
-                create_rg,
-                create_law,
-            ),
+        deployment_id = _start_workspace_creation(
+            workspace_form, client_secret, create_rg, create_law
         )
-        thread.start()
         logger.info(f"Redirecting to monitor for deployment_id={deployment_id}")
         return redirect(
             url_for("workspace.monitor", deployment_id=deployment_id)
@@ -104,6 +148,45 @@ def create_rg_law():
     return render_template("create_rg_law.html")
 
 
+@workspace_bp.route("/retry/<deployment_id>", methods=["POST"])
+def retry(deployment_id):
+    """
+    Resume a failed workspace deployment from the step that failed.
+
+    Uses the form and flags the deployment started with; only the secret
+    comes from the session, which must belong to the same user or app
+    registration that started it.
+    """
+    deployment = deployments.get(deployment_id)
+    if not deployment:
+        logger.error(f"Deployment not found: {deployment_id}")
+        return "Deployment not found.", 404
+    if deployment["status"] != "Error":
+        return "Only failed deployments can be retried.", 409
+    workspace_form = deployment["workspace_form"]
+    client_secret = session.get("client_secret")
+    if not has_credentials(workspace_form, client_secret):
+        logger.error(f"No credentials to retry deployment {deployment_id}")
+        return "Workspace credentials missing.", 400
+    if not _owns_deployment(workspace_form, client_secret):
+        logger.error(f"Retry of deployment {deployment_id} by another user")
+        return "Deployment belongs to another user.", 403
+    logger.info(
+        f"Retrying deployment {deployment_id}, skipping completed steps "
+        f"{deployment.get('completed_steps')}"
+    )
+    new_deployment_id = _start_workspace_creation(
+        workspace_form,
+        client_secret,
+        deployment["create_rg"],
+        deployment["create_law"],
+        deployment.get("completed_steps"),
+    )
+    return redirect(
+        url_for("workspace.monitor", deployment_id=new_deployment_id)
+    )
+
+
 @workspace_bp.route("/monitor/<deployment_id>")
 def monitor(deployment_id):
     """Monitor the progress of a workspace deployment and display status/results."""
@@ -125,6 +208,7 @@ def monitor(deployment_id):
             logs=deployment["logs"],
             refresh=False,
             error=True,
+            retry_url=url_for("workspace.retry", deployment_id=deployment_id),
         )
     logger.info(f"Deployment {deployment_id} in progress.")
     return render_template(
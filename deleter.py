@@ -1,19 +1,34 @@
 """Delete multiple Sentinel workspaces for testing purposes"""
 
 import src.sentinel_workspace as sw
+import src.fleet as fleet
 
-# For numbered in sequence
-# for i in range(9):
-#     print(f"Deleting attempt {i}")
-#     sc = sw.SentinelWorkspace(
-#         tenant_id="8e64ba45-8728-476b-bf1f-84bb53f56ff7",
-#         client_id="f41b6ba9-813b-4096-b769-e3b03e4a0d4c",
-#         client_secret="",
-#         sub_id="25bce547-25db-47a6-a2bc-54e836303446",
-#         rg_name=f"rg-{i}",
-#         ws_name=f"ws-{i}",
-#     )
-#     sc.delete_sentinel_solution()
+TENANT_ID = "8e64ba45-8728-476b-bf1f-84bb53f56ff7"
+CLIENT_ID = "f41b6ba9-813b-4096-b769-e3b03e4a0d4c"
+SUB_ID = "25bce547-25db-47a6-a2bc-54e836303446"
+
+
+def teardown_numbered(count: int, delete_workspaces: bool = False):
+    """Offboard rg-0/ws-0 .. rg-<count-1>/ws-<count-1> in parallel"""
+    targets = [(SUB_ID, f"rg-{i}", f"ws-{i}") for i in range(count)]
+    results = fleet.bulk_teardown(
+        targets,
+        lambda t: sw.SentinelWorkspace(
+            tenant_id=TENANT_ID,
+            client_id=CLIENT_ID,
+            client_secret="",
+            sub_id=t.subscription_id,
+            rg_name=t.resource_group,
+            ws_name=t.workspace_name,
+        ),
+        delete_workspaces=delete_workspaces,
+    )
+    for row in fleet.result_matrix(results):
+        print(row)
+
+
+# For numbered in sequence, offboarded in parallel
+# teardown_numbered(9)
 
 # For single ws
 sc = sw.SentinelWorkspace(
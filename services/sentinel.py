@@ -2,10 +2,32 @@
 
 from src.app_logging import logger
 from src.sentinel_workspace import SentinelWorkspace
+from src.deploy_checkpoint import DeployCheckpoint
+import src.fleet as fleet
+import src.workspace_flow as wf
 
 # pylint: disable=W1203, W0718
 
 
+STEP_MESSAGES = {
+    wf.RESOURCE_GROUP: "Resource group",
+    wf.LOG_ANALYTICS: "Log Analytics Workspace",
+    wf.ONBOARD: "Sentinel onboarding",
+}
+
+
+def _step_log(result):
+    """One log line for a finished workspace step"""
+    label = STEP_MESSAGES.get(result.name, result.name)
+    if result.status == "Completed":
+        return f"{label} completed successfully!"
+    if result.status == "Skipped":
+        return f"{label} skipped: a previous step failed."
+    return f"Error: {label} failed." + (
+        f" {result.error}" if result.error else ""
+    )
+
+
 def create_workspace_task(
     deployment_id,
     subscription_id,
@@ -19,20 +41,25 @@ def create_workspace_task(
     token_cache_user_id=None,
     create_rg=False,
     create_law=False,
+    completed_steps=None,
 ):
     """Background task to create a Sentinel workspace in a separate thread.
     Args:
         create_rg (bool): Whether to create the resource group.
         create_law (bool): Whether to create the log analytics workspace.
+        completed_steps (list): Steps finished by an earlier attempt, which
+            are not run again.
     """
     logs = []
+    deployments[deployment_id]["completed_steps"] = list(completed_steps or [])
     try:
         logger.info(
             f"[create_workspace_task] Starting workspace creation for "
             f"{workspace_name} in {resource_group} (create_rg={create_rg}, "
-            f"create_law={create_law})"
+            f"create_law={create_law}, resuming={completed_steps or []})"
         )
         logs.append("Initializing Sentinel Workspace creation...")
+        deployments[deployment_id]["logs"] = logs
         # Let SentinelWorkspace load the cache/token if a user id was provided
         workspace = SentinelWorkspace(
             sub_id=subscription_id,
@@ -43,57 +70,40 @@ def create_workspace_task(
             client_secret=client_secret,
             token_cache_user_id=token_cache_user_id,
         )
-        if create_rg and create_law:
-            # Pass create_rg and create_law to your workspace creation logic as needed
-            a = workspace.create_sentinel_workspace(region=region)
-            if a:
-                logs.append("Sentinel Workspace created successfully!")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Completed"
-                logger.info(
-                    f"[create_workspace_task] Workspace {workspace_name} created successfully."
-                )
-            else:
-                logs.append("Error: Workspace creation failed.")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Error"
-                logger.error(
-                    f"[create_workspace_task] Workspace creation failed for {workspace_name}."
-                )
-        elif create_law and not create_rg:
-            # If only log analytics workspace is to be created
-            a = workspace.create_log_analytics_workspace(location=region)
-            if a:
-                logs.append("Log Analytics Workspace created successfully!")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Completed"
-                logger.info(
-                    f"[create_workspace_task] Log Analytics Workspace "
-                    f"{workspace_name} created successfully."
-                )
-            else:
-                logs.append("Error: Log Analytics Workspace creation failed.")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Error"
-                logger.error(
-                    "[create_workspace_task] Log Analytics Workspace creation"
-                    f"failed for {workspace_name}."
-                )
-            b = workspace.onboard_sentinel()
-            if b:
-                logs.append("Sentinel onboarded successfully!")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Completed"
-                logger.info(
-                    f"[create_workspace_task] Sentinel onboarded successfully for {workspace_name}."
-                )
-            else:
-                logs.append("Error: Sentinel onboarding failed.")
-                deployments[deployment_id]["logs"] = logs
-                deployments[deployment_id]["status"] = "Error"
-                logger.error(
-                    f"[create_workspace_task] Sentinel onboarding failed for {workspace_name}."
+
+        def on_step(result):
+            logs.append(_step_log(result))
+            deployments[deployment_id]["logs"] = logs
+            if result.status == "Completed":
+                deployments[deployment_id]["completed_steps"].append(
+                    result.name
                 )
+
+        results = wf.run_workspace_flow(
+            workspace,
+            region,
+            completed_steps=set(completed_steps or []),
+            on_step=on_step,
+            create_rg=create_rg,
+            create_law=create_law,
+        )
+        deployments[deployment_id]["completed_steps"] = (
+            wf.completed_step_names(results)
+        )
+        failed = [r.name for r in results.values() if r.status != "Completed"]
+        if not failed:
+            logs.append("Sentinel Workspace created successfully!")
+            deployments[deployment_id]["status"] = "Completed"
+            logger.info(
+                f"[create_workspace_task] Workspace {workspace_name} created successfully."
+            )
+        else:
+            deployments[deployment_id]["status"] = "Error"
+            logger.error(
+                f"[create_workspace_task] Workspace creation failed for "
+                f"{workspace_name} at steps: {failed}"
+            )
+        deployments[deployment_id]["logs"] = logs
     except Exception as e:
         logs.append(f"Error: {str(e)}")
         deployments[deployment_id]["logs"] = logs
@@ -146,8 +156,23 @@ def deploy_rules_task(
     workspace_form,
     client_secret,
     deployments,
+    filters=None,
+    preflight=None,
+    dedup=None,
+    coverage_target=None,
+    only_changed=False,
 ):
-    """Background task to deploy analytic alert rules to the Sentinel workspace."""
+    """Background task to deploy analytic alert rules to the Sentinel workspace.
+    Args:
+        filters (dict): rule_index filters; only matching rules are deployed.
+        preflight (str): "skip" to leave out rules without data sources.
+        dedup (str): "skip" to leave out rules duplicating another's query,
+            "report" to deploy them and only log the duplicates.
+        coverage_target (float): deploy only enough rules to cover this
+            fraction of the ATT&CK techniques the rules cover.
+        only_changed (bool): deploy only rules that are missing or whose
+            template has a newer version.
+    """
     logs = []
     try:
         logger.info(
@@ -165,7 +190,22 @@ def deploy_rules_task(
             access_token=None,
             token_cache_user_id=workspace_form["user_id"],
         )
-        responses = sent_client.deploy_rules()
+        checkpoint = DeployCheckpoint.for_workspace(sent_client)
+        if checkpoint.entries:
+            logs.append(
+                f"Resuming: {len(checkpoint.succeeded())} rules were "
+                "already deployed."
+            )
+            deployments[deployment_id]["logs"] = logs
+        responses = sent_client.deploy_rules(
+            checkpoint=checkpoint,
+            filters=filters,
+            preflight=preflight,
+            dedup=dedup,
+            coverage_target=coverage_target,
+            stream=True,
+            only_changed=only_changed,
+        )
         if False not in responses:
             logs.append("All rules deployed successfully.")
             deployments[deployment_id]["logs"] = logs
@@ -186,3 +226,75 @@ def deploy_rules_task(
         deployments[deployment_id]["logs"] = logs
         deployments[deployment_id]["status"] = "Error"
         logger.error(f"[deploy_rules_task] Exception: {e}")
+
+
+def fleet_deploy_rules_task(
+    deployment_id,
+    targets,
+    workspace_form,
+    client_secret,
+    deployments,
+    max_workers=8,
+    per_subscription=2,
+):
+    """Background task to deploy analytic rules to many workspaces.
+    Args:
+        targets (list): (subscription_id, resource_group, workspace_name)
+            for each workspace. Rules are taken from the first one.
+    """
+    logs = []
+    try:
+        logger.info(
+            f"[fleet_deploy_rules_task] Deploying rules to {len(targets)} "
+            "workspaces"
+        )
+        logs.append(f"Deploying rules to {len(targets)} workspaces...")
+        deployments[deployment_id]["logs"] = logs
+
+        def make_workspace(target):
+            return SentinelWorkspace(
+                sub_id=target.subscription_id,
+                rg_name=target.resource_group,
+                ws_name=target.workspace_name,
+                tenant_id=workspace_form.get("tenant_id"),
+                client_id=workspace_form.get("client_id"),
+                client_secret=client_secret,
+                access_token=None,
+                token_cache_user_id=workspace_form.get("user_id"),
+            )
+
+        def on_result(result):
+            logs.append(
+                f"{result.target}: {result.status} ({result.deployed} "
+                f"deployed, {result.failed} failed)"
+                + (f" - {result.error}" if result.error else "")
+            )
+            deployments[deployment_id]["logs"] = logs
+
+        results = fleet.deploy_rules_to_fleet(
+            targets,
+            make_workspace,
+            max_workers=max_workers,
+            per_subscription=per_subscription,
+            on_result=on_result,
+        )
+        deployments[deployment_id]["results"] = fleet.result_matrix(results)
+        failed = [r for r in results.values() if r.status != "Completed"]
+        if not failed:
+            logs.append("All rules deployed to every workspace.")
+            deployments[deployment_id]["status"] = "Completed"
+            logger.info("[fleet_deploy_rules_task] Fleet deploy completed")
+        else:
+            logs.append(
+                f"Error: {len(failed)} of {len(results)} workspaces failed."
+            )
+            deployments[deployment_id]["status"] = "Error"
+            logger.error(
+                f"[fleet_deploy_rules_task] {len(failed)} workspaces failed"
+            )
+        deployments[deployment_id]["logs"] = logs
+    except Exception as e:
+        logs.append(f"Error: {str(e)}")
+        deployments[deployment_id]["logs"] = logs
+        deployments[deployment_id]["status"] = "Error"
+        logger.error(f"[fleet_deploy_rules_task] Exception: {e}")
@@ -0,0 +1,50 @@
+"""
+Write files by renaming a finished temp file over them.
+
+A reader never sees a half-written file, and an interrupted write leaves
+the previous file in place. Imports nothing from the app so that both the
+src-relative and the package-style modules can use it.
+"""
+
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+
+
+def _umask() -> int:
+    """The process umask; os.umask can only read it by setting it"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# Read once at import: setting the umask from worker threads would race
+FILE_MODE = 0o666 & ~_umask()
+
+
+@contextlib.contextmanager
+def atomic_open(path: Path, mode: str = "wb", **kwargs):
+    """
+    Open a temp file next to `path` that replaces it on a clean exit.
+
+    If the block raises or is interrupted the temp file is removed and any
+    existing `path` is left untouched.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        # mkstemp creates the file 0600; give it the mode open() would
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write `data` to `path` via a temp file and rename"""
+    with atomic_open(path) as f:
+        f.write(data)
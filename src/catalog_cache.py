@@ -0,0 +1,108 @@
+"""
+Sidecar cache of parsed and validated rule catalogs.
+
+Reading a rule directory parses and models every YAML in it. The cache
+keeps the result for each file in a pickle next to the YAMLs, keyed by the
+file's path, mtime and size, so unchanged files are loaded without parsing
+or validating them again. The cache is tagged with a schema version
+derived from the model sources, so editing a model invalidates it.
+
+Only enable it for directories you trust: the sidecar is a pickle.
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+from pathlib import Path
+import pydantic
+import app_logging as al
+import atomic_file as af
+
+# pylint: disable=W1203, W0718
+
+CACHE_FORMAT = 1
+# Modules whose source changes how a cached catalog was built
+SCHEMA_MODULES = (
+    "in_out",
+    "nrt_rule",
+    "nrt_rule_template",
+    "scheduled_rule",
+    "scheduled_rule_template",
+)
+
+
+@functools.cache
+def schema_version() -> str:
+    """Hash of the cache format, pydantic version and model sources"""
+    digest = hashlib.sha256(f"{CACHE_FORMAT}:{pydantic.VERSION}".encode())
+    here = Path(__file__).parent
+    for name in SCHEMA_MODULES:
+        digest.update((here / f"{name}.py").read_bytes())
+    return digest.hexdigest()
+
+
+def file_signature(path: str) -> tuple[int, int] | None:
+    """(mtime_ns, size) of a file, or None if it cannot be read"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CatalogCache:
+    """Per-file cache of one catalog kind in one directory"""
+
+    def __init__(self, directory: str | Path, name: str):
+        self.path = Path(directory) / f".{name}.catalog_cache"
+        self.entries = {}
+        self.seen = set()
+        self.dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        """Load the cache, ignoring a missing or outdated one"""
+        try:
+            with open(self.path, "rb") as f:
+                cache = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            al.logger.warning(f"Ignoring unreadable catalog cache: {e}")
+            return
+        if cache.get("version") == schema_version():
+            self.entries = cache["entries"]
+        else:
+            al.logger.info(f"Catalog cache {self.path} is out of date")
+
+    def get(self, path: str, signature: tuple[int, int]):
+        """Return (True, value) for a fresh entry, else (False, None)"""
+        self.seen.add(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == signature:
+            return True, entry[1]
+        return False, None
+
+    def put(self, path: str, signature: tuple[int, int], value) -> None:
+        """Record the value built from `path` as it was at `signature`"""
+        self.seen.add(path)
+        self.entries[path] = (signature, value)
+        self.dirty = True
+
+    def save(self) -> None:
+        """Drop entries for files that are gone and persist if changed"""
+        stale = self.entries.keys() - self.seen
+        for path in stale:
+            del self.entries[path]
+        if not (self.dirty or stale):
+            return
+        cache = {"version": schema_version(), "entries": self.entries}
+        try:
+            af.atomic_write(
+                self.path,
+                pickle.dumps(cache, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+        except OSError as e:
+            al.logger.warning(f"Could not write catalog cache: {e}")
+        self.dirty = False
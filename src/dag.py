@@ -0,0 +1,142 @@
+"""
+Small DAG executor for dependent deployment steps.
+
+Each step is a callable that returns a truthy value on success, like the
+SentinelWorkspace methods do. Steps run on a thread pool as soon as every
+step they require has completed. A step whose requirement failed is
+skipped, and so is everything downstream of it, while independent
+branches keep running.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+import src.app_logging as al
+
+# pylint: disable=W1203, W0718
+
+COMPLETED = "Completed"
+ERROR = "Error"
+SKIPPED = "Skipped"
+
+
+@dataclass
+class Step:
+    """One unit of work and the names of the steps it waits for"""
+
+    name: str
+    func: Callable[[], object]
+    requires: tuple[str, ...] = ()
+
+
+@dataclass
+class StepResult:
+    """Outcome of one step"""
+
+    name: str
+    status: str
+    value: object = None
+    error: str | None = None
+    seconds: float = 0.0
+    requires: tuple[str, ...] = field(default_factory=tuple)
+
+
+def _check(steps: dict[str, Step]) -> None:
+    """Raise ValueError for unknown requirements or a cycle"""
+    for step in steps.values():
+        for name in step.requires:
+            if name not in steps:
+                raise ValueError(f"Step {step.name} requires unknown {name}")
+    state = {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle: {' -> '.join(path)}")
+        state[name] = "visiting"
+        for required in steps[name].requires:
+            visit(required, [*path, required])
+        state[name] = "done"
+
+    for name in steps:
+        visit(name, [name])
+
+
+def _run_step(step: Step) -> StepResult:
+    start = time.perf_counter()
+    try:
+        value = step.func()
+        status = COMPLETED if value else ERROR
+        error = None if value else "step returned a failure"
+    except Exception as e:
+        value, status, error = None, ERROR, str(e)
+        al.logger.error(f"Step {step.name} failed: {e}")
+    return StepResult(
+        step.name,
+        status,
+        value,
+        error,
+        time.perf_counter() - start,
+        step.requires,
+    )
+
+
+def run_dag(
+    steps: list[Step],
+    max_workers: int = 8,
+    on_step: Callable[[StepResult], None] = None,
+    completed: set[str] = None,
+) -> dict[str, StepResult]:
+    """
+    Run `steps` in dependency order, independent ones in parallel.
+
+    Steps named in `completed`, e.g. from an earlier failed run, are not
+    run again and count as completed. `on_step` is called as each step
+    finishes or is skipped. Returns the result of every step by name.
+    """
+    by_name = {step.name: step for step in steps}
+    if len(by_name) != len(steps):
+        raise ValueError("Step names must be unique")
+    _check(by_name)
+    results = {
+        name: StepResult(name, COMPLETED, requires=by_name[name].requires)
+        for name in completed or ()
+        if name in by_name
+    }
+    waiting = {n: s for n, s in by_name.items() if n not in results}
+
+    def record(result):
+        results[result.name] = result
+        if on_step is not None:
+            on_step(result)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        while waiting or pending:
+            for name, step in list(waiting.items()):
+                states = [results.get(r) for r in step.requires]
+                if any(
+                    s is not None and s.status != COMPLETED for s in states
+                ):
+                    del waiting[name]
+                    record(
+                        StepResult(
+                            name,
+                            SKIPPED,
+                            error="a required step did not complete",
+                            requires=step.requires,
+                        )
+                    )
+                elif all(s is not None for s in states):
+                    del waiting[name]
+                    pending[pool.submit(_run_step, step)] = name
+            if not pending:
+                # Skipping can unblock more skips; loop until settled
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.pop(future)
+                record(future.result())
+    return results
@@ -0,0 +1,156 @@
+"""
+Durable per-rule checkpoints for alert rule deployments.
+
+Each workspace gets an append-only JSONL file recording, per rule template
+and template version, the rule name assigned to it and whether its PUT
+succeeded. The name is recorded and fsynced before the PUT is sent, so a
+deployment that dies at any point can be resumed: rules that succeeded at
+the same version are skipped and the rest are retried under the name they
+were first given, updating the rule if it was in fact created instead of
+creating a duplicate. Records older than the checkpoint's max age are
+dropped when it is loaded, and a file holding nothing newer is removed.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+import src.app_logging as al
+
+# pylint: disable=W1203
+
+ASSIGNED = "assigned"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+MAX_AGE_HOURS = 24
+
+
+def checkpoint_dir() -> Path:
+    """Where checkpoints are kept, DEPLOY_CHECKPOINT_DIR or the temp dir"""
+    return Path(
+        os.environ.get("DEPLOY_CHECKPOINT_DIR")
+        or Path(tempfile.gettempdir()) / "sentinel_deploy_checkpoints"
+    )
+
+
+class DeployCheckpoint:
+    """Checkpoint of one workspace's rule deployment"""
+
+    def __init__(
+        self,
+        workspace_key: str,
+        directory: str | Path = None,
+        max_age_hours: float = MAX_AGE_HOURS,
+    ):
+        digest = hashlib.sha256(workspace_key.encode()).hexdigest()[:32]
+        self.path = Path(directory or checkpoint_dir()) / f"{digest}.jsonl"
+        self.max_age = max_age_hours * 3600
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.names = {}
+        self._load()
+
+    @classmethod
+    def for_workspace(
+        cls,
+        workspace,
+        directory: str | Path = None,
+        max_age_hours: float = MAX_AGE_HOURS,
+    ):
+        """Checkpoint keyed by the workspace's subscription, RG and name"""
+        return cls(
+            f"{workspace.subscription_id}/{workspace.resource_group_name}/"
+            f"{workspace.workspace_name}",
+            directory,
+            max_age_hours,
+        )
+
+    def _load(self) -> None:
+        """
+        Replay the file; the last record per template and version wins.
+        Records past the max age are ignored, and a file with no fresh
+        records left is removed.
+        """
+        oldest = time.time() - self.max_age
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A record cut short by a crash
+                        continue
+                    if record.get("time", 0) < oldest:
+                        continue
+                    self._remember(record)
+        except FileNotFoundError:
+            return
+        if not self.entries:
+            al.logger.info(f"Dropping expired checkpoint {self.path}")
+            self.path.unlink(missing_ok=True)
+            return
+            al.logger.info(
+                f"Resuming deployment from {self.path}: "
+                f"{len(self.succeeded())} rules already deployed"
+            )
+
+    def _remember(self, record: dict) -> None:
+        self.entries[(record["template"], record.get("version"))] = record
+        self.names[record["template"]] = record["name"]
+
+    def _append(self, record: dict) -> None:
+        record["time"] = time.time()
+        with self.lock:
+            self._remember(record)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(json.dumps(record).encode() + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def status(self, template: str, version: str | None) -> str | None:
+        """Last recorded status for a template at a version, if any"""
+        entry = self.entries.get((template, version))
+        return entry["status"] if entry else None
+
+    def name(self, template: str) -> str | None:
+        """Rule name last assigned to a template at any version, if any"""
+        return self.names.get(template)
+
+    def succeeded(self) -> set[tuple[str, str | None]]:
+        """(template, version) pairs whose rule was deployed"""
+        return {k for k, e in self.entries.items() if e["status"] == SUCCEEDED}
+
+    def assign(self, template: str, version: str | None, name: str) -> None:
+        """Record the rule name for a template before it is sent"""
+        self._append(
+            {
+                "template": template,
+                "version": version,
+                "name": name,
+                "status": ASSIGNED,
+            }
+        )
+
+    def record(
+        self, template: str, version: str | None, name: str, ok: bool
+    ) -> None:
+        """Record the outcome of a rule's PUT"""
+        self._append(
+            {
+                "template": template,
+                "version": version,
+                "name": name,
+                "status": SUCCEEDED if ok else FAILED,
+            }
+        )
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the whole deployment has succeeded"""
+        with self.lock:
+            self.entries = {}
+            self.names = {}
+            self.path.unlink(missing_ok=True)
@@ -1,52 +1,434 @@
 """Deploy Analytic Rules to Workspace"""
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import src.app_logging as al
-import src.nrt_rule_template as nrt
-import src.scheduled_rule_template as srt
+import src.deploy_checkpoint as dc
+import src.kql_fingerprint as kf
+import src.mitre_coverage as mc
+import src.preflight as pf
+import src.query_load as ql
+import src.rule_batch as rb
+import src.rule_index as ri
+import src.rule_pipeline as rp
 import src.template_to_rule as ttr
 
 # import src.sentinel_workspace as sw
 
 # pylint: disable=W1203, W1201, W0718
 
+# Content templates fetched per batch when streaming, and concurrently
+CONTENT_BATCH_SIZE = 50
+CONTENT_WORKERS = 8
+# Rules sent concurrently when streaming
+PUT_WORKERS = 4
+DEDUP_MODES = ("skip", "report")
+
 
 def model_templates_for_deployment(templates: list[dict]):
     """Model rules for deployment"""
-    modeled_rules = []
-    for rule in templates:
+    result = rb.validate_templates(templates)
+    for error in result.errors:
+        al.logger.error(
+            f"Error creating {error.kind} template {error.name}: {error.message}"
+        )
+    al.logger.debug(f"Modeled {len(result.models)} of {len(templates)} rules")
+    return result.models
+
+
+def rule_template(content_template: dict) -> dict:
+    """The rule template of a content template, carrying its version"""
+    template = content_template["properties"]["mainTemplate"]["resources"][0]
+    template["properties"]["version"] = content_template["properties"][
+        "version"
+    ]
+    return template
+
+
+def content_rule_templates(self) -> list[dict]:
+    """The rule templates from the workspace's installed content"""
+    content_templates_from_ws = self.list_rule_content_templates()["value"]
+    return [rule_template(c) for c in content_templates_from_ws]
+
+
+def existing_rule_names(deployed: list[dict]) -> dict[str, str]:
+    """Name of the workspace's rule for each template it was deployed from"""
+    return {
+        rule["properties"]["alertRuleTemplateName"]: rule["name"]
+        for rule in deployed
+        if rule.get("properties", {}).get("alertRuleTemplateName")
+    }
+
+
+def name_rule(self, alert, rule_names: dict) -> None:
+    """
+    Give a rule still named after its template the name of the workspace's
+    existing rule for that template, so rules created under an earlier
+    naming scheme are updated in place, or else its rule_name_for_template
+    """
+    template = alert.properties.alertRuleTemplateName
+    if template is not None and alert.name == template:
+        alert.name = rule_names.get(template) or self.rule_name_for_template(
+            template
+        )
+
+
+def changed_content_names(self, deployed: list[dict]) -> list[str]:
+    """
+    Names of the content templates whose rule is not among the `deployed`
+    rules at their current version, from metadata without the templates
+    themselves
+    """
+    versions = {
+        rule["properties"].get("alertRuleTemplateName"): rule[
+            "properties"
+        ].get("templateVersion")
+        for rule in deployed
+    }
+    return [
+        content["name"]
+        for content in self.iter_rule_content_metadata()
+        if versions.get(content["properties"].get("contentId"), False)
+        != content["properties"].get("version")
+    ]
+
+
+def iter_content_rule_templates(
+    self,
+    names: list[str] = None,
+    batch_size: int = CONTENT_BATCH_SIZE,
+    max_workers: int = CONTENT_WORKERS,
+    failures: list[str] = None,
+):
+    """
+    Yields the workspace's rule templates as they are fetched.
+
+    Lists content template metadata (or takes `names`), then fetches the
+    full content templates concurrently a batch at a time, so at most one
+    batch of templates is held while the first are already yielded. The
+    names of templates that could not be fetched are appended to
+    `failures` when given.
+    """
+    if names is None:
+        names = [c["name"] for c in self.iter_rule_content_metadata()]
+    al.logger.info(f"Fetching {len(names)} content templates")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for start in range(0, len(names), batch_size):
+            chunk = names[start : start + batch_size]
+            for name, content_template in zip(
+                chunk, pool.map(self.get_rule_content_template, chunk)
+            ):
+                if isinstance(content_template, dict):
+                    yield rule_template(content_template)
+                else:
+                    al.logger.error(f"Could not fetch content template {name}")
+                    if failures is not None:
+                        failures.append(name)
+
+
+def create_update_alert_checkpointed(
+    self,
+    alert,
+    checkpoint: dc.DeployCheckpoint,
+    enabled: bool = False,
+    rule_names: dict = None,
+):
+    """
+    Create one alert, recording its outcome in `checkpoint`.
+
+    A rule the checkpoint already has as deployed at the template's version
+    is skipped. Otherwise it is sent under the name the checkpoint assigned
+    the template, or the name name_rule gives it from `rule_names`,
+    recorded before the request goes out.
+    """
+    template = alert.properties.alertRuleTemplateName
+    if template is None:
+        return self.create_update_alert(alert, enabled=enabled)
+    version = alert.properties.templateVersion
+    if checkpoint.status(template, version) == dc.SUCCEEDED:
+        return True
+    name = checkpoint.name(template)
+    if name is None:
+        name_rule(self, alert, rule_names or {})
+        name = alert.name
+    if checkpoint.status(template, version) is None:
+        checkpoint.assign(template, version, name)
+    alert.name = name
+    response = self.create_update_alert(alert, enabled=enabled)
+    checkpoint.record(template, version, name, response is not False)
+    return response
+
+
+def create_update_alerts_checkpointed(
+    self,
+    alerts: list,
+    checkpoint: dc.DeployCheckpoint,
+    enabled: bool = False,
+    rule_names: dict = None,
+):
+    """
+    Create alerts one by one with create_update_alert_checkpointed. The
+    checkpoint is cleared once every rule has been deployed.
+    """
+    responses = [
+        create_update_alert_checkpointed(
+            self, alert, checkpoint, enabled, rule_names
+        )
+        for alert in alerts
+    ]
+    if False not in responses:
+        checkpoint.clear()
+    return responses
+
+
+def is_duplicate_query(index: kf.FingerprintIndex, entry) -> bool:
+    """Add a template's query entry to `index`, logging a duplicate"""
+    original, _ = index.add_entry(entry)
+    if original is not None:
+        al.logger.warning(
+            f"Template {entry.name} duplicates the query of {original}"
+        )
+    return original is not None
+
+
+def skip_duplicate_queries(
+    templates: list[dict], mode: str = "skip", near_threshold: float = None
+) -> list[dict]:
+    """Log templates with duplicate queries and drop them if mode is skip"""
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode: {mode}")
+    kept, replaced_by = kf.dedup_templates(templates, near_threshold)
+    for name, original in replaced_by.items():
+        al.logger.warning(
+            f"Template {name} duplicates the query of {original}"
+        )
+    al.logger.info(
+        f"{len(templates) - len(kept)} of {len(templates)} templates "
+        "duplicate a query"
+    )
+    return kept if mode == "skip" else templates
+
+
+def select_for_coverage(
+    templates: list[dict], target: float, deployed: list[dict]
+):
+    """
+    The fewest templates that, with the `deployed` rules already in the
+    workspace, cover `target` of the ATT&CK cells the templates cover
+    """
+    space = mc.CoverageSpace.from_rules(templates, deployed)
+    goal = space.coverage(templates)
+    covered = space.coverage(deployed)
+    selected, reached = mc.select_rules(
+        space, templates, target, covered=covered, goal=goal
+    )
+    al.logger.info(
+        f"{len(selected)} of {len(templates)} templates raise ATT&CK "
+        f"coverage from {space.fraction(covered, goal):.0%} to "
+        f"{space.fraction(reached, goal):.0%} of {goal.bit_count()} cells"
+    )
+    return selected
+
+
+def template_selector(
+    self,
+    filters: dict = None,
+    preflight: str = None,
+    dedup: str = None,
+    near_threshold: float = None,
+):
+    """
+    The deploy selection as a function of one raw template, returning it
+    if it is to be deployed and None if not, for streaming deployments.
+    Duplicate queries are tracked across every template it is given.
+    """
+    if preflight not in (None, *pf.MODES):
+        raise ValueError(f"Unknown preflight mode: {preflight}")
+    if dedup not in (None, *DEDUP_MODES):
+        raise ValueError(f"Unknown dedup mode: {dedup}")
+    filters = dict(filters or {})
+    text = filters.pop("text", None)
+    matches = ri.template_filter(text, **filters)
+    index = kf.FingerprintIndex(near_threshold) if dedup else None
+    lock = threading.Lock()
+
+    def select(template: dict):
+        if not matches(template):
+            return None
+        if (
+            preflight
+            and not pf.check_template(template, pf.workspace_sources(self))
+            and preflight == "skip"
+        ):
+            return None
+        if dedup:
+            entry = index.template_entry(template)
+            with lock:
+                duplicate = is_duplicate_query(index, entry)
+            if duplicate and dedup == "skip":
+                return None
+        return template
+
+    return select
+
+
+def deploy_alert_rules_streamed(
+    self,
+    checkpoint: dc.DeployCheckpoint = None,
+    filters: dict = None,
+    preflight: str = None,
+    dedup: str = None,
+    near_threshold: float = None,
+    only_changed: bool = False,
+    put_workers: int = PUT_WORKERS,
+    deployed: list[dict] = None,
+):
+    """
+    deploy_alert_rules as a streaming pipeline.
+
+    Templates are fetched, selected, modeled and sent, `put_workers` at a
+    time, in stages running in their own threads and joined by bounded
+    queues (see rule_pipeline), so only a bounded number of templates and
+    rules is held at any time. The query load of the rules is accumulated
+    as they are modeled and logged once they have all been sent. With
+    `only_changed` only templates whose rule is missing or at another
+    version are fetched at all. A template that
+    could not be fetched counts as a failed rule. `deployed`, the
+    workspace's alert rules, is listed if not given.
+    """
+    if deployed is None:
+        deployed = list(self.list_alert_rules())
+    rule_names = existing_rule_names(deployed)
+    names = changed_content_names(self, deployed) if only_changed else None
+    columns = ql.RuleColumns()
+    columns_lock = threading.Lock()
+    failures = []
+
+    def model(template: dict):
         try:
-            al.logger.debug(
-                f"Modeling rule {rule['name']}: "
-                + f"{rule['properties']['displayName']}"
-            )
-            if rule["kind"] == "NRT":
-                modeled_rules.append(nrt.NrtRuleTemplate(**rule))
-            elif rule["kind"] == "Scheduled":
-                modeled_rules.append(srt.ScheduledAlertRuleTemplate(**rule))
-            else:
-                al.logger.warning(f"{rule['kind']} for rule {rule['name']}")
+            rule = ttr.rule_from_template_dict(template, enabled=False)
+            with columns_lock:
+                columns.add_rules([rule])
         except Exception as e:
             al.logger.error(
-                f"Error creating ScheduledAlertRuleTemplate {rule['name']}: {e}"
+                f"Error translating template {template.get('name')} "
+                f"to rule: {e}"
             )
-            continue
-    return modeled_rules
+            return None
+        return rule
 
+    def send(rule):
+        if checkpoint is not None:
+            return create_update_alert_checkpointed(
+                self, rule, checkpoint, enabled=False, rule_names=rule_names
+            )
+        name_rule(self, rule, rule_names)
+        return self.create_update_alert(rule, enabled=False)
 
-def deploy_alert_rules(self):
-    """Deploy alert rules to the workspace"""
-    templates_to_deploy = []
-    al.logger.info(f"Deploying alert rules to workspace: {self.workspace_name}")
+    responses = list(
+        rp.run_pipeline(
+            iter_content_rule_templates(self, names, failures=failures),
+            [
+                rp.Stage(
+                    "select",
+                    template_selector(
+                        self, filters, preflight, dedup, near_threshold
+                    ),
+                ),
+                rp.Stage("model", model),
+                rp.Stage("send", send, workers=put_workers),
+            ],
+        )
+    )
+    ql.log_load(ql.estimate_load(columns), self.workspace_name)
+    responses += [False] * len(failures)
+    if checkpoint is not None and False not in responses:
+        checkpoint.clear()
+    return responses
 
-    content_templates_from_ws = self.list_rule_content_templates()["value"]
-    for content_template in content_templates_from_ws:
-        content_rule_template = content_template["properties"]["mainTemplate"][
-            "resources"
-        ][0]
-        content_rule_template["properties"]["version"] = content_template[
-            "properties"
-        ]["version"]
-        templates_to_deploy.append(content_rule_template)
-    modeled_templates = model_templates_for_deployment(templates_to_deploy)
-    modeled_rules = ttr.translate_templates_to_rules(modeled_templates, False)
+
+def deploy_alert_rules(
+    self,
+    checkpoint: dc.DeployCheckpoint = None,
+    filters: dict = None,
+    preflight: str = None,
+    dedup: str = None,
+    near_threshold: float = None,
+    coverage_target: float = None,
+    stream: bool = False,
+    only_changed: bool = False,
+):
+    """
+    Deploy alert rules to the workspace.
+
+    Templates are translated straight to rule models in one validation pass.
+    With a `checkpoint` the deployment resumes where an earlier attempt stopped.
+    `filters` are rule_index filters selecting which templates to deploy,
+    e.g. {"tactics": ["Persistence"], "severities": ["High"]}.
+    `preflight` "skip" leaves out templates whose data sources the
+    workspace lacks, "flag" only logs them. `dedup` "skip" leaves out
+    templates whose query duplicates an earlier one's, "report" only logs
+    them; with `near_threshold` near-duplicate queries count too.
+    `coverage_target`, a fraction, deploys only the fewest templates that
+    bring ATT&CK coverage to it, counting rules already deployed. The
+    query load of the rules is estimated and logged before they are sent,
+    or after when streaming.
+    `stream` fetches, models and sends templates through a pipeline
+    instead of holding the whole catalog, see deploy_alert_rules_streamed;
+    a coverage target needs the whole catalog, so it turns streaming off.
+    `only_changed`, when streaming, deploys only templates whose rule is
+    missing or at another version.
+    The workspace's alert rules are listed once; a template's rule keeps
+    the name of the workspace's existing rule for it, see name_rule.
+    """
+    al.logger.info(
+        f"Deploying alert rules to workspace: {self.workspace_name}"
+    )
+    deployed = list(self.list_alert_rules())
+    if stream and not coverage_target:
+        return deploy_alert_rules_streamed(
+            self,
+            checkpoint=checkpoint,
+            filters=filters,
+            preflight=preflight,
+            dedup=dedup,
+            near_threshold=near_threshold,
+            only_changed=only_changed,
+            deployed=deployed,
+        )
+    templates_to_deploy = content_rule_templates(self)
+    if filters:
+        templates_to_deploy = ri.RuleIndex(templates_to_deploy).search(
+            **filters
+        )
+        al.logger.info(
+            f"{len(templates_to_deploy)} templates match filters {filters}"
+        )
+    if preflight:
+        templates_to_deploy = pf.preflight_templates(
+            self, templates_to_deploy, mode=preflight
+        )
+    if dedup:
+        templates_to_deploy = skip_duplicate_queries(
+            templates_to_deploy, dedup, near_threshold
+        )
+    if coverage_target:
+        templates_to_deploy = select_for_coverage(
+            templates_to_deploy, coverage_target, deployed
+        )
+    modeled_rules = ttr.rules_from_template_dicts(
+        templates_to_deploy, enabled=False
+    )
+    ql.log_load(ql.estimate_load(modeled_rules), self.workspace_name)
+    rule_names = existing_rule_names(deployed)
+    if checkpoint is not None:
+        return create_update_alerts_checkpointed(
+            self,
+            modeled_rules,
+            checkpoint,
+            enabled=False,
+            rule_names=rule_names,
+        )
+    for rule in modeled_rules:
+        name_rule(self, rule, rule_names)
     return self.create_update_alerts(modeled_rules, enabled=False)
@@ -93,7 +93,7 @@ def deploy_solution_content(self, package_body: dict, deploy_name: str):
         f"Deploying solution content with deployment name: {deploy_name}"
     )
     resource = (
-        f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+        f"{self.management_url}/subscriptions/{self.subscription_id}/"
         f"resourceGroups/{self.resource_group_name}/"
         f"providers/Microsoft.Resources/deployments/{deploy_name}"
         "?api-version=2025-04-01"
@@ -112,6 +112,64 @@ def deploy_solution_content(self, package_body: dict, deploy_name: str):
     )
 
 
+def solution_deployment_name(package_name: str) -> str:
+    """ARM deployment name for a solution, max length is 64 characters"""
+    return f"deploy-{package_name.replace(' ', '-')}"[:64]
+
+
+def deploy_product_package(self, package: dict, ws_location: str):
+    """Deploy one solution and all of its content"""
+    package_name = package["properties"]["displayName"]
+    logger.info(f"Deploying package: {package_name}")
+    # Get the solution and all of its content
+    product_package = get_content_product_package(self, package["name"])
+    if not product_package:
+        logger.error(
+            "Failed to get content product package details"
+            f"for: {package_name}. Check logs for details."
+        )
+        return False
+
+    # Remove invalid characters
+    full_resources = product_package["properties"]["packagedContent"][
+        "resources"
+    ]
+    for resource in full_resources:
+        if (
+            "mainTemplate" in resource["properties"].keys()
+            and "metadata" in resource["properties"]["mainTemplate"].keys()
+            and "postDeployment"
+            in resource["properties"]["mainTemplate"]["metadata"].keys()
+        ):
+            resource["properties"]["mainTemplate"]["metadata"][
+                "postDeployment"
+            ] = None
+    # Prepare the body for deployment
+    package_content_body = {
+        "properties": {
+            "parameters": {
+                "workspace": {"value": self.workspace_name},
+                "workspace-location": {"value": ws_location},
+            },
+            "template": product_package["properties"]["packagedContent"],
+            "mode": "Incremental",
+        }
+    }
+    deploy_name = solution_deployment_name(package_name)
+    # Deploy the solution and all of its contents
+    install_result = deploy_solution_content(
+        self, package_content_body, deploy_name
+    )
+    if not install_result:
+        logger.error(
+            f"Failed to deploy resource: {package_name}."
+            " Check logs for details."
+        )
+        return False
+    logger.info(f"Resource {package_name} deployed successfully.")
+    return install_result
+
+
 def full_solution_deploy(
     self, ws_location: str, desired_solutions: list = None
 ):
@@ -127,57 +185,7 @@ def full_solution_deploy(
     ]
     logger.info("Filtered packages to deploy")
     for package in prod_packages:
-        package_name = package["properties"]["displayName"]
-        logger.info(f"Deploying package: {package_name}")
-        # Get the solution and all of its content
-        product_package = get_content_product_package(self, package["name"])
-        if not product_package:
-            logger.error(
-                "Failed to get content product package details"
-                f"for: {package_name}. Check logs for details."
-            )
-            continue
-
-        # Remove invalid characters
-        full_resources = product_package["properties"]["packagedContent"][
-            "resources"
-        ]
-        for resource in full_resources:
-            if (
-                "mainTemplate" in resource["properties"].keys()
-                and "metadata" in resource["properties"]["mainTemplate"].keys()
-                and "postDeployment"
-                in resource["properties"]["mainTemplate"]["metadata"].keys()
-            ):
-                resource["properties"]["mainTemplate"]["metadata"][
-                    "postDeployment"
-                ] = None
-        # Prepare the body for deployment
-        package_content_body = {
-            "properties": {
-                "parameters": {
-                    "workspace": {"value": self.workspace_name},
-                    "workspace-location": {"value": ws_location},
-                },
-                "template": product_package["properties"]["packagedContent"],
-                "mode": "Incremental",
-            }
-        }
-        # Create deployment name, max length is 64 characters
-        deploy_name = f"deploy-{package_name.replace(' ', '-')}"
-        if len(deploy_name) > 64:
-            deploy_name = deploy_name[:64]
-        # Deploy the solution and all of its contents
-        install_result = deploy_solution_content(
-            self, package_content_body, deploy_name
-        )
-        if not install_result:
-            logger.error(
-                f"Failed to deploy resource: {package_name}."
-                " Check logs for details."
-            )
-            continue
-        logger.info(f"Resource {package_name} deployed successfully.")
+        deploy_product_package(self, package, ws_location)
     return prod_packages
 
 
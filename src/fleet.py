@@ -0,0 +1,266 @@
+"""
+Deploy the same alert rules to many workspaces at once.
+
+The rule content is fetched, modeled and serialized once and the result is
+reused for every target. Targets are deployed in parallel under a global
+cap and a per-subscription cap, so one large subscription cannot starve
+the others or run into its ARM throttling limits.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, NamedTuple
+import src.app_logging as al
+import src.dag as dag
+import src.deploy_rules as dr
+import src.rule_serialization as rs
+import src.template_to_rule as ttr
+
+# pylint: disable=W1203, W0718
+
+
+class FleetTarget(NamedTuple):
+    """One workspace to deploy to"""
+
+    subscription_id: str
+    resource_group: str
+    workspace_name: str
+
+    def __str__(self):
+        return (
+            f"{self.subscription_id}/{self.resource_group}/"
+            f"{self.workspace_name}"
+        )
+
+
+@dataclass
+class TargetResult:
+    """Outcome of deploying to one target"""
+
+    target: FleetTarget
+    status: str = "Pending"
+    deployed: int = 0
+    failed: int = 0
+    error: str | None = None
+    seconds: float = 0.0
+    steps: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class PreparedRules:
+    """Rule models and their request bodies, built once for the fleet"""
+
+    rules: list
+    bodies: list[bytes]
+
+
+def prepare_rules(templates: list[dict]):
+    """Model and serialize rule templates once for every target"""
+    rules = ttr.rules_from_template_dicts(templates, enabled=False)
+    return PreparedRules(rules, rs.rule_bodies(rules, enabled=False))
+
+
+def deploy_prepared(workspace, prepared: PreparedRules) -> list:
+    """
+    Deploy prepared rules to one workspace.
+
+    Each target gets shallow copies of the models: create_update_alert
+    names a rule on first deploy, and the shared models must not change
+    under other threads.
+    """
+    return workspace.create_update_alerts(
+        [rule.model_copy() for rule in prepared.rules],
+        bodies=prepared.bodies,
+    )
+
+
+def _deploy_target(
+    target: FleetTarget, make_workspace: Callable, prepared: PreparedRules
+) -> TargetResult:
+    result = TargetResult(target)
+    start = time.perf_counter()
+    try:
+        responses = deploy_prepared(make_workspace(target), prepared)
+        result.failed = sum(1 for r in responses if r is False)
+        result.deployed = len(responses) - result.failed
+        result.status = "Completed" if not result.failed else "Error"
+    except Exception as e:
+        result.status = "Error"
+        result.error = str(e)
+        al.logger.error(f"Fleet deploy to {target} failed: {e}")
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def deploy_rules_to_fleet(
+    targets: list[FleetTarget],
+    make_workspace: Callable[[FleetTarget], object],
+    prepared: PreparedRules = None,
+    max_workers: int = 8,
+    per_subscription: int = 2,
+    on_result: Callable[[TargetResult], None] = None,
+) -> dict[FleetTarget, TargetResult]:
+    """
+    Deploy rules to every target in parallel.
+
+    `make_workspace` builds the SentinelWorkspace for a target. Without
+    `prepared` the rules are taken from the first target's content
+    templates. At most `max_workers` targets run at once, and at most
+    `per_subscription` from any one subscription. `on_result` is called
+    as each target finishes. Returns a result per target, in input order.
+    """
+    targets = [FleetTarget(*target) for target in targets]
+    results = {target: TargetResult(target) for target in targets}
+    if not targets:
+        return results
+    if prepared is None:
+        templates = dr.content_rule_templates(make_workspace(targets[0]))
+        prepared = prepare_rules(templates)
+    al.logger.info(
+        f"Deploying {len(prepared.rules)} rules to {len(targets)} workspaces"
+    )
+
+    queued = defaultdict(deque)
+    for target in results:
+        queued[target.subscription_id].append(target)
+    running = defaultdict(int)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+
+        def fill():
+            for subscription, waiting in queued.items():
+                while (
+                    waiting
+                    and running[subscription] < per_subscription
+                    and len(pending) < max_workers
+                ):
+                    target = waiting.popleft()
+                    running[subscription] += 1
+                    results[target].status = "In Progress"
+                    future = pool.submit(
+                        _deploy_target, target, make_workspace, prepared
+                    )
+                    pending[future] = target
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                target = pending.pop(future)
+                running[target.subscription_id] -= 1
+                results[target] = future.result()
+                if on_result is not None:
+                    on_result(results[target])
+            fill()
+    return results
+
+
+def result_matrix(results: dict[FleetTarget, TargetResult]) -> list[dict]:
+    """Flatten fleet results into one row per workspace"""
+    return [
+        {
+            "subscription_id": target.subscription_id,
+            "resource_group": target.resource_group,
+            "workspace_name": target.workspace_name,
+            "status": result.status,
+            "deployed": result.deployed,
+            "failed": result.failed,
+            "error": result.error,
+            "seconds": round(result.seconds, 2),
+        }
+        for target, result in results.items()
+    ]
+
+
+def _workspace_cache(make_workspace: Callable) -> Callable:
+    """Build each target's workspace once, on first use, from any thread"""
+    workspaces = {}
+    lock = threading.Lock()
+
+    def get(target: FleetTarget):
+        with lock:
+            if target not in workspaces:
+                workspaces[target] = make_workspace(target)
+            return workspaces[target]
+
+    return get
+
+
+def _target_results(
+    step_targets: dict[str, list[FleetTarget]],
+    step_results: dict[str, dag.StepResult],
+    targets: list[FleetTarget],
+) -> dict[FleetTarget, TargetResult]:
+    """Roll step results up to one status per target"""
+    results = {target: TargetResult(target) for target in targets}
+    for name, step_result in step_results.items():
+        for target in step_targets[name]:
+            result = results[target]
+            result.steps[name] = step_result.status
+            result.seconds += step_result.seconds
+            if step_result.status == dag.ERROR and result.error is None:
+                result.error = f"{name}: {step_result.error}"
+    for result in results.values():
+        statuses = result.steps.values()
+        result.deployed = sum(1 for s in statuses if s == dag.COMPLETED)
+        result.failed = len(result.steps) - result.deployed
+        result.status = "Completed" if not result.failed else "Error"
+    return results
+
+
+def bulk_teardown(
+    targets: list[FleetTarget],
+    make_workspace: Callable[[FleetTarget], object],
+    delete_workspaces: bool = True,
+    delete_resource_groups: bool = False,
+    force: bool = False,
+    max_workers: int = 8,
+    on_step: Callable[[dag.StepResult], None] = None,
+) -> dict[FleetTarget, TargetResult]:
+    """
+    Offboard Sentinel from every target, targets in parallel.
+
+    With `delete_workspaces` the log analytics workspace is deleted after
+    offboarding; `force` skips its soft-delete retention. With
+    `delete_resource_groups` each resource group is deleted once every
+    target in it is done.
+    """
+    targets = [FleetTarget(*target) for target in targets]
+    workspace = _workspace_cache(make_workspace)
+    steps = {}
+    step_targets = defaultdict(list)
+    group_steps = defaultdict(list)
+    for target in targets:
+        last = f"offboard:{target}"
+        steps[last] = dag.Step(
+            last, lambda t=target: workspace(t).delete_sentinel_solution()
+        )
+        step_targets[last].append(target)
+        if delete_workspaces:
+            law_step = f"law-delete:{target}"
+            steps[law_step] = dag.Step(
+                law_step,
+                lambda t=target: workspace(t).delete_log_analytics_workspace(
+                    force=force
+                ),
+                (last,),
+            )
+            step_targets[law_step].append(target)
+            last = law_step
+        group_steps[(target.subscription_id, target.resource_group)].append(
+            (target, last)
+        )
+    if delete_resource_groups:
+        for (subscription, group), members in group_steps.items():
+            rg_step = f"rg-delete:{subscription}/{group}"
+            steps[rg_step] = dag.Step(
+                rg_step,
+                lambda t=members[0][0]: workspace(t).delete_resource_group(),
+                tuple(last for _, last in members),
+            )
+            step_targets[rg_step].extend(target for target, _ in members)
+    step_results = dag.run_dag(list(steps.values()), max_workers, on_step)
+    return _target_results(step_targets, step_results, targets)
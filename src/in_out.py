@@ -1,7 +1,8 @@
 """Input and output functions for Sentinel Automation rules."""
 
-import time
+import uuid
 from pathlib import Path
+from typing import Iterable, Iterator
 import glob
 from pydantic import BaseModel
 import yaml
@@ -10,88 +11,191 @@ import nrt_rule_template as nrt
 import scheduled_rule_template as srt
 import scheduled_rule as sr
 import nrt_rule as nr
+import yaml_parse as yp
+import atomic_file as af
+import catalog_cache as cc
 
 # pylint: disable=W1203
 
 
-def write_rule_to_file(rule_2_write: BaseModel, out_dir: Path) -> None:
-    """Write rule to file."""
+try:
+    from yaml import CSafeDumper as _SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeDumper as _SafeDumper
 
-    if rule_2_write.id is not None:
-        file_name = out_dir / rule_2_write.id
-        file_name = file_name.with_suffix(".yaml")
-    else:
-        file_name = out_dir / str(time.time())
-        file_name = file_name.with_suffix(".yaml")
 
-    data = rule_2_write.model_dump(mode="python")
+class RuleDumper(_SafeDumper):  # pylint: disable=R0901
+    """Safe YAML dumper that writes multiline strings as block scalars."""
+
+
+def _represent_str(dumper, data):
+    if "\n" in data:
+        return dumper.represent_scalar(
+            "tag:yaml.org,2002:str", data, style="|"
+        )
+    return dumper.represent_scalar("tag:yaml.org,2002:str", data)
 
-    def represent_multiline_str(dumper, data):
-        if "\n" in data:
-            return dumper.represent_scalar(
-                "tag:yaml.org,2002:str", data, style="|"
-            )
-        return dumper.represent_scalar("tag:yaml.org,2002:str", data)
 
-    yaml.add_representer(str, represent_multiline_str)
-    with open(file_name, "w", encoding="utf-8") as f:
-        yaml.dump(data, f)
-        # YAML.dump(data, f)
+RuleDumper.add_representer(str, _represent_str)
+
+
+def rule_file_stem(rule: BaseModel) -> str:
+    """File name for a rule: the last segment of its id, else its name."""
+    if rule.id:
+        return rule.id.rstrip("/").rsplit("/", 1)[-1]
+    return rule.name or str(uuid.uuid4())
+
+
+def _rule_documents(rules: Iterable[BaseModel]) -> Iterator[dict]:
+    """Dump rules to plain data, logging and skipping any that fail."""
+    for rule in rules:
+        try:
+            yield rule.model_dump(mode="json")
+        except Exception as e:  # pylint: disable=W0718
+            al.logger.error(f"Error dumping rule {rule.name}: {e}")
 
 
-def write_rules_to_file(rules_list: list[BaseModel], out_dir: Path) -> None:
-    """Write rules to file."""
+def write_rule_to_file(rule_2_write: BaseModel, out_dir: Path) -> Path:
+    """Write rule to file."""
+    file_name = (out_dir / rule_file_stem(rule_2_write)).with_suffix(".yaml")
+    data = rule_2_write.model_dump(mode="json")
+    with af.atomic_open(file_name, "w", encoding="utf-8") as f:
+        yaml.dump(data, f, Dumper=RuleDumper)
+    return file_name
+
+
+def write_rules_to_file(
+    rules_list: Iterable[BaseModel],
+    out_dir: Path,
+    single_file: str | None = None,
+) -> int:
+    """
+    Write rules to file, one YAML per rule.
+
+    `rules_list` may be any iterable, e.g. a generator, and is consumed one
+    rule at a time. With `single_file` all rules go to one multi-document
+    YAML of that name in `out_dir` instead. Every file is written to a temp
+    file and renamed into place, so an interrupted export never leaves a
+    partial file behind. Returns the number of rules written.
+    """
+    if single_file is not None:
+        written = 0
+
+        def counted(documents):
+            nonlocal written
+            for document in documents:
+                written += 1
+                yield document
+
+        file_name = Path(out_dir) / single_file
+        with af.atomic_open(file_name, "w", encoding="utf-8") as f:
+            yaml.dump_all(
+                counted(_rule_documents(rules_list)), f, Dumper=RuleDumper
+            )
+        return written
+
+    written = 0
     for rule in rules_list:
         try:
             al.logger.debug(f"Writing rule {rule.name} to file")
             write_rule_to_file(rule, out_dir)
-        except (
-            FileNotFoundError,
-            PermissionError,
-            OSError,
-            IOError,
-            OSError,
-        ) as e:
+            written += 1
+        except (OSError, yaml.YAMLError) as e:
             al.logger.error(f"Error writing rule {rule.name} to file: {e}")
             continue
+    return written
+
+
+def _yaml_files(file_path: Path) -> list[str]:
+    """YAML files in a directory."""
+    return glob.glob(f"{file_path}/*.yaml") + glob.glob(f"{file_path}/*.yml")
+
+
+def _parse_yaml_files(files: list[str]) -> list[tuple[str, object]]:
+    """Parse YAML files, logging files that fail."""
+    parsed = []
+    for result in yp.parse_files(files):
+        if result.error is not None:
+            al.logger.error(f"Error parsing {result.source}: {result.error}")
+        else:
+            parsed.append((result.source, result.data))
+    return parsed
+
+
+def _read_catalog(
+    file_path: Path, build, name: str, use_cache: bool = False
+) -> list:
+    """
+    Parse and build every YAML file in a directory, in file order.
+
+    `build` turns parsed data into a catalog item, or None to skip it. With
+    `use_cache` the built items are kept in a sidecar cache and only new or
+    changed files are parsed and built again.
+    """
+    files = _yaml_files(file_path)
+    if not use_cache:
+        built = (build(data) for _, data in _parse_yaml_files(files))
+        return [item for item in built if item is not None]
+
+    cache = cc.CatalogCache(file_path, name)
+    items = {}
+    signatures = {}
+    for path in files:
+        signature = cc.file_signature(path)
+        hit, item = cache.get(path, signature)
+        if hit:
+            items[path] = item
+        else:
+            signatures[path] = signature
+    if signatures:
+        al.logger.debug(
+            f"Catalog cache: {len(items)} hits, {len(signatures)} misses"
+        )
+    for path, data in _parse_yaml_files(list(signatures)):
+        item = build(data)
+        items[path] = item
+        if signatures[path] is not None:
+            cache.put(path, signatures[path], item)
+    cache.save()
+    return [items[path] for path in files if items.get(path) is not None]
+
+
+def _model_template(data: dict) -> BaseModel | None:
+    """Model a parsed rule template."""
+    if data.get("kind") == "Scheduled":
+        return srt.ScheduledAlertRuleTemplate(**data)
+    if data.get("kind") == "NRT":
+        return nrt.NrtRuleTemplate(**data)
+    al.logger.warning(
+        f"Unknown rule type: {data.get('properties').get('kind')}"
+    )
+    return None
+
 
+def _model_rule(data: dict) -> BaseModel | None:
+    """Model a parsed rule."""
+    if data.get("kind") == "Scheduled":
+        return sr.ScheduledAlertRule(**data)
+    if data.get("kind") == "NRT":
+        return nr.NrtAlertRule(**data)
+    al.logger.warning(
+        f"Unknown rule type: {data.get('properties').get('kind')}"
+    )
+    return None
 
-def read_templates_from_file(file_path: Path) -> list[BaseModel]:
+
+def read_templates_from_file(
+    file_path: Path, use_cache: bool = False
+) -> list[BaseModel]:
     """Read rules from file."""
-    modeled_rules = []
-    rules = glob.glob(f"{file_path}/*.yaml") + glob.glob(f"{file_path}/*.yml")
-    for rule in rules:
-        with open(rule, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            if data.get("kind") == "Scheduled":
-                modeled_rules.append(srt.ScheduledAlertRuleTemplate(**data))
-            elif data.get("kind") == "NRT":
-                modeled_rules.append(nrt.NrtRuleTemplate(**data))
-            else:
-                al.logger.warning(
-                    f"Unknown rule type: {data.get('properties').get('kind')}"
-                )
-                continue
-    return modeled_rules
-
-
-def read_rules_from_file(file_path: Path) -> list[BaseModel]:
+    return _read_catalog(file_path, _model_template, "templates", use_cache)
+
+
+def read_rules_from_file(
+    file_path: Path, use_cache: bool = False
+) -> list[BaseModel]:
     """Read rules from file."""
-    modeled_rules = []
-    rules = glob.glob(f"{file_path}/*.yaml") + glob.glob(f"{file_path}/*.yml")
-    for rule in rules:
-        with open(rule, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            if data.get("kind") == "Scheduled":
-                modeled_rules.append(sr.ScheduledAlertRule(**data))
-            elif data.get("kind") == "NRT":
-                modeled_rules.append(nr.NrtAlertRule(**data))
-            else:
-                al.logger.warning(
-                    f"Unknown rule type: {data.get('properties').get('kind')}"
-                )
-                continue
-    return modeled_rules
+    return _read_catalog(file_path, _model_rule, "rules", use_cache)
 
 
 def write_content_packages_to_file(content_packages: list, out_dir: Path):
@@ -103,18 +207,14 @@ def write_content_packages_to_file(content_packages: list, out_dir: Path):
         b = {"properties": package.pop("properties")}
         b["properties"].pop("id")
         file_name = file_name.with_suffix(".yaml")
-        with open(file_name, "w", encoding="utf-8") as f:
-            yaml.dump(b, f)
+        with af.atomic_open(file_name, "w", encoding="utf-8") as f:
+            yaml.dump(b, f, Dumper=RuleDumper)
 
 
-def read_content_packages_from_file(file_path: Path) -> list:
+def read_content_packages_from_file(
+    file_path: Path, use_cache: bool = False
+) -> list:
     """Read content packages from file."""
-    content_packages = []
-    packages = glob.glob(f"{file_path}/*.yaml") + glob.glob(
-        f"{file_path}/*.yml"
+    return _read_catalog(
+        file_path, lambda data: data, "content_packages", use_cache
     )
-    for package in packages:
-        with open(package, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            content_packages.append(data)
-    return content_packages
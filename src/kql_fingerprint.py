@@ -0,0 +1,214 @@
+"""
+Fingerprints of KQL rule queries for finding duplicate detections.
+
+A query is normalized by dropping // comments and collapsing whitespace,
+including around operators and pipes, outside string literals. Its
+fingerprint is a hash of that text, so queries that differ only in layout
+or comments collide. For near-duplicates each query is also broken into
+token shingles compared by Jaccard similarity. Only a prefix of each
+query's shingles, rarest first, is indexed: two sets reaching a similarity
+threshold must share one of their prefix shingles, so a query is compared
+only with the few queries sharing a rare phrase with it and none at or
+above the threshold are missed.
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+SHINGLE_SIZE = 4
+
+PUNCTUATION = set("|,;()[]{}=<>!+-*/%:.")
+LEXEME = re.compile(
+    r"@'[^']*'|@\"[^\"]*\""  # verbatim strings
+    r"|'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\""  # strings
+    r"|//[^\n]*"  # comments
+    r"|\s+|[^\s'\"/@]+|[/@]"
+)
+TOKEN = re.compile(r"""'[^']*'|"[^"]*"|\w+|[^\w\s]""")
+
+
+def normalize_query(query: str) -> str:
+    """Query text with comments dropped and insignificant space removed"""
+    out = []
+    pending_space = False
+    for lexeme in LEXEME.findall(query):
+        if lexeme.startswith("//") or lexeme.isspace():
+            pending_space = True
+            continue
+        if (
+            pending_space
+            and out
+            and out[-1][-1] not in PUNCTUATION
+            and lexeme[0] not in PUNCTUATION
+        ):
+            out.append(" ")
+        pending_space = False
+        out.append(lexeme)
+    return "".join(out)
+
+
+def _digest(normalized: str) -> str:
+    return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> frozenset[int]:
+    """
+    Hashes of the token n-grams of a normalized query. They use the
+    built-in hash, so only compare shingles from the same process.
+    """
+    tokens = TOKEN.findall(normalized)
+    tokens += [""] * (size - len(tokens))
+    return frozenset(map(hash, zip(*(tokens[i:] for i in range(size)))))
+
+
+def jaccard(left: frozenset, right: frozenset) -> float:
+    """Exact Jaccard similarity of two sets"""
+    if not left and not right:
+        return 1.0
+    shared = len(left & right)
+    return shared / (len(left) + len(right) - shared)
+
+
+def prefix_length(size: int, threshold: float) -> int:
+    """
+    How many of a set's shingles, in a fixed order, must include one
+    shared with any set it is at least `threshold` similar to
+    """
+    # Tolerate float error so that e.g. 0.9 * 10 is still 9
+    return size - math.ceil(threshold * size - 1e-9) + 1 if size else 0
+
+
+@dataclass
+class QueryEntry:
+    """A named query and its fingerprints"""
+
+    name: str
+    digest: str
+    shingles: frozenset[int] = frozenset()
+
+
+class FingerprintIndex:
+    """
+    Online duplicate detection over named queries.
+
+    `add` reports whether a query duplicates one added before and only
+    indexes it when it does not, so each group of duplicates is
+    represented by its first member. With `near_threshold` queries whose
+    shingle similarity reaches it also count as duplicates. `frequencies`,
+    counts of how many of the queries contain each shingle, orders
+    shingles rarest first so that candidates are few; without it shingles
+    are ordered by hash, which finds the same matches more slowly.
+    """
+
+    def __init__(
+        self,
+        near_threshold: float | None = None,
+        frequencies: Counter | None = None,
+    ):
+        self.near_threshold = near_threshold
+        self.frequencies = frequencies or Counter()
+        self.entries = []
+        self.by_digest = {}
+        self.postings = {}
+
+    def entry(self, name: str, query: str) -> QueryEntry:
+        """Fingerprints of a query, shingled if near matches are wanted"""
+        normalized = normalize_query(query or "")
+        entry = QueryEntry(name, _digest(normalized))
+        if self.near_threshold is not None:
+            entry.shingles = shingles(normalized)
+        return entry
+
+    def template_entry(self, template: dict) -> QueryEntry:
+        """`entry` for the query of a raw template"""
+        return self.entry(
+            template.get("name"), template["properties"].get("query")
+        )
+
+    def template_entries(self, templates: list[dict]) -> list[QueryEntry]:
+        """
+        Entries of a whole catalog of raw templates, taking the shingle
+        frequencies from it when near matches are wanted.
+        """
+        entries = [self.template_entry(t) for t in templates]
+        if self.near_threshold is not None:
+            self.frequencies = Counter(h for e in entries for h in e.shingles)
+        return entries
+
+    def _prefix(self, entry: QueryEntry) -> list[int]:
+        ordered = sorted(
+            entry.shingles, key=lambda h: (self.frequencies[h], h)
+        )
+        return ordered[: prefix_length(len(ordered), self.near_threshold)]
+
+    def _near_match(self, entry: QueryEntry, prefix: list[int]):
+        """(earlier entry, similarity) of the most similar match, if any"""
+        candidates = set()
+        for h in prefix:
+            candidates.update(self.postings.get(h, ()))
+        size = len(entry.shingles)
+        best, best_similarity = None, 0.0
+        for position in sorted(candidates):
+            candidate = self.entries[position]
+            # The smaller set over the larger bounds their similarity
+            other = len(candidate.shingles)
+            if min(size, other) < self.near_threshold * max(size, other):
+                continue
+            similarity = jaccard(entry.shingles, candidate.shingles)
+            if similarity >= self.near_threshold and similarity > (
+                best_similarity
+            ):
+                best, best_similarity = candidate, similarity
+        return best, best_similarity
+
+    def add_entry(self, entry: QueryEntry) -> tuple[str | None, float]:
+        """`add` for a query already fingerprinted with `entry`"""
+        if entry.digest in self.by_digest:
+            return self.entries[self.by_digest[entry.digest]].name, 1.0
+        prefix = []
+        if self.near_threshold is not None:
+            prefix = self._prefix(entry)
+            match, similarity = self._near_match(entry, prefix)
+            if match is not None:
+                return match.name, similarity
+        position = len(self.entries)
+        self.entries.append(entry)
+        self.by_digest[entry.digest] = position
+        for h in prefix:
+            self.postings.setdefault(h, []).append(position)
+        return None, 0.0
+
+    def add(self, name: str, query: str) -> tuple[str | None, float]:
+        """
+        Check a query against those already added. Returns the name of
+        the query it duplicates and their similarity (1.0 for an exact
+        duplicate), or (None, 0.0) after indexing it as a new query.
+        """
+        return self.add_entry(self.entry(name, query))
+
+
+def dedup_templates(
+    templates: list[dict], near_threshold: float | None = None
+) -> tuple[list[dict], dict[str, str]]:
+    """
+    Drop raw templates whose query duplicates an earlier template's.
+
+    Exact duplicates are always dropped; with `near_threshold` so are
+    near-duplicates at or above that similarity. Returns the kept
+    templates and a map of each dropped template's name to the name of
+    the template kept in its place.
+    """
+    index = FingerprintIndex(near_threshold)
+    entries = index.template_entries(templates)
+    kept = []
+    replaced_by = {}
+    for template, entry in zip(templates, entries):
+        original, _ = index.add_entry(entry)
+        if original is None:
+            kept.append(template)
+        else:
+            replaced_by[entry.name] = original
+    return kept, replaced_by
@@ -0,0 +1,151 @@
+"""
+MITRE ATT&CK coverage of alert rules and rule templates.
+
+A rule covers each (tactic, technique) cell of the ATT&CK matrix formed by
+its tactics and techniques, sub-techniques counting towards their parent.
+A CoverageSpace numbers the cells found in some rules, after which the
+coverage of any rule set is an int used as a bitset: unions, gaps between
+workspaces and cell counts are single integer operations however many
+rules or workspaces are compared. select_rules picks a small set of
+templates reaching a coverage target by greedy set cover.
+
+Works on rule and template models and on raw dicts alike, so deployed
+rules can come straight from the alert rule listing.
+"""
+
+import heapq
+import math
+from functools import reduce
+from operator import or_
+from typing import Iterable
+import src.scheduled_rule as sr
+
+Cell = tuple[str, str]
+
+
+def _get(item, key: str):
+    """Attribute of a model or key of a dict"""
+    if isinstance(item, dict):
+        return item.get(key)
+    return getattr(item, key, None)
+
+
+def _name(value) -> str:
+    """A tactic or technique as text, enums unwrapped"""
+    return str(getattr(value, "value", value)).strip()
+
+
+def rule_cells(rule) -> set[Cell]:
+    """The (tactic, technique) cells a rule or template covers"""
+    properties = _get(rule, "properties") or {}
+    tactics = {_name(t) for t in _get(properties, "tactics") or ()}
+    techniques = {
+        sr.split_technique(_name(t).upper())[0]
+        for t in [
+            *(_get(properties, "techniques") or ()),
+            *(_get(properties, "subTechniques") or ()),
+        ]
+    }
+    return {(tactic, tech) for tactic in tactics for tech in techniques}
+
+
+class CoverageSpace:
+    """Numbering of matrix cells so that coverage can be held as an int"""
+
+    def __init__(self, cells: Iterable[Cell] = ()):
+        self.cells = sorted(set(cells))
+        self.bits = {cell: 1 << i for i, cell in enumerate(self.cells)}
+
+    @classmethod
+    def from_rules(cls, *rule_sets: Iterable) -> "CoverageSpace":
+        """Space of every cell covered by any of the given rules"""
+        return cls(
+            cell
+            for rules in rule_sets
+            for rule in rules
+            for cell in rule_cells(rule)
+        )
+
+    @property
+    def full(self) -> int:
+        """Mask of every cell in the space"""
+        return (1 << len(self.cells)) - 1
+
+    def mask(self, rule) -> int:
+        """Cells a rule covers; cells outside the space are ignored"""
+        return reduce(or_, (self.bits.get(c, 0) for c in rule_cells(rule)), 0)
+
+    def masks(self, rules: Iterable) -> list[int]:
+        """Mask of each rule"""
+        return [self.mask(rule) for rule in rules]
+
+    def coverage(self, rules: Iterable) -> int:
+        """Cells covered by any of the rules"""
+        return reduce(or_, self.masks(rules), 0)
+
+    def fraction(self, mask: int, of: int = None) -> float:
+        """Share of the cells in `of` (default all) that `mask` covers"""
+        of = self.full if of is None else of
+        total = of.bit_count()
+        return (mask & of).bit_count() / total if total else 1.0
+
+    def cells_of(self, mask: int) -> list[Cell]:
+        """The cells set in a mask"""
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(self.cells[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def matrix(self, mask: int = None) -> dict[str, list[str]]:
+        """Covered techniques per tactic, of `mask` or the whole space"""
+        matrix = {}
+        for tactic, technique in self.cells_of(
+            self.full if mask is None else mask
+        ):
+            matrix.setdefault(tactic, []).append(technique)
+        return matrix
+
+    def compare(self, rule_sets: dict[str, Iterable]) -> dict[str, int]:
+        """Coverage of each named rule set, e.g. one per workspace"""
+        return {
+            name: self.coverage(rules) for name, rules in rule_sets.items()
+        }
+
+
+def select_rules(
+    space: CoverageSpace,
+    templates: list,
+    target: float = 1.0,
+    covered: int = 0,
+    goal: int = None,
+) -> tuple[list, int]:
+    """
+    Pick few templates whose coverage, added to `covered`, reaches
+    `target`, a fraction of the `goal` cells (default all those the
+    templates cover).
+
+    Greedy set cover: the template adding the most uncovered cells is taken
+    until the target is met; gains are re-computed lazily since they only
+    shrink. Returns the picked templates in their original order and the
+    coverage reached.
+    """
+    masks = space.masks(templates)
+    if goal is None:
+        goal = reduce(or_, masks, 0)
+    needed = math.ceil(target * goal.bit_count() - 1e-9)
+    heap = [(-m.bit_count(), i) for i, m in enumerate(masks) if m & goal]
+    heapq.heapify(heap)
+    picked = []
+    while heap and (covered & goal).bit_count() < needed:
+        stale_gain, position = heapq.heappop(heap)
+        gain = (masks[position] & goal & ~covered).bit_count()
+        if not gain:
+            continue
+        if gain < -stale_gain:
+            heapq.heappush(heap, (-gain, position))
+            continue
+        picked.append(position)
+        covered |= masks[position]
+    return [templates[position] for position in sorted(picked)], covered
@@ -8,7 +8,7 @@ Reference: https://learn.microsoft.com/en-us/rest/api/securityinsights/
 """
 
 # pylint: disable=E0213, R0903
-from typing import List
+from typing import List, Literal
 from pydantic import (
     BaseModel,
     Field,
@@ -24,20 +24,20 @@ class NrtAlertRuleProperties(BaseModel):
     enabled: bool = Field(default=False)
     query: str
     severity: sr.AlertSeverity
-    suppressionDuration: str = "PT5M"
+    suppressionDuration: sr.Duration = "PT5M"
     suppressionEnabled: bool = False
     alertDetailsOverride: sr.AlertDetailsOverride | None = None
     alertRuleTemplateName: str | None = None
     customDetails: dict | None = None
     description: str | None = None
     entityMappings: List[sr.EntityMapping] | None = None
-    eventGroupingSettings: sr.EventGroupingSettings | None
+    eventGroupingSettings: sr.EventGroupingSettings | None = None
     incidentConfiguration: sr.IncidentConfiguration | None = None
-    sentinelEntitiesMappings: List[sr.SentinelEntityMapping] | None
+    sentinelEntitiesMappings: List[sr.SentinelEntityMapping] | None = None
     subTechniques: List[str] | None = None
     tactics: List[sr.AttackTactic] | None = None
     techniques: List[str] | None = None
-    templateVersion: str | None
+    templateVersion: str | None = None
 
     class Config:
         """Config"""
@@ -57,12 +57,18 @@ class NrtAlertRuleProperties(BaseModel):
         except KeyError:
             return values
 
+    @model_validator(mode="before")
+    @classmethod
+    def validate_techniques(cls, values: dict) -> dict:
+        """validate"""
+        return sr.normalize_techniques(values)
+
 
 class NrtAlertRule(BaseModel):
     """Model"""
 
     id: str | None = None
     name: str | None = None
-    kind: str = Field(default="NRT")
+    kind: Literal["NRT"] = Field(default="NRT")
     properties: NrtAlertRuleProperties
     etag: str | None = None
@@ -6,8 +6,8 @@ Reference: https://learn.microsoft.com/en-us/rest/api/securityinsights/
             2024-01-01-preview&tabs=HTTP#nrtalertrule
 """
 
-from typing import List, Dict
-from pydantic import Field, BaseModel
+from typing import List, Dict, Literal
+from pydantic import Field, BaseModel, model_validator
 import src.scheduled_rule as sr
 import src.scheduled_rule_template as srt
 
@@ -24,12 +24,19 @@ class NrtRuleTemplateProperties(BaseModel):
     severity: sr.AlertSeverity
     tactics: List[sr.AttackTactic] | None = None
     techniques: List[str] | None = None
+    subTechniques: List[str] | None = None
     version: str
     requiredDataConnectors: List[srt.AlertRuleTemplateDataSources] | None = None
     status: srt.TemplateStatus | None = None
     description: str | None = None
     displayName: str
 
+    @model_validator(mode="before")
+    @classmethod
+    def validate_techniques(cls, values: dict) -> dict:
+        """validate"""
+        return sr.normalize_techniques(values)
+
 
 class NrtRuleTemplate(BaseModel):
     """Model"""
@@ -37,5 +44,5 @@ class NrtRuleTemplate(BaseModel):
     id: str | None = None
     name: str | None = None
     type: str | None = None
-    kind: str = Field(default="NRT")
+    kind: Literal["NRT"] = Field(default="NRT")
     properties: NrtRuleTemplateProperties
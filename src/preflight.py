@@ -0,0 +1,168 @@
+"""
+Pre-flight check of rule templates against a workspace's data sources.
+
+Looks up once which tables of the workspace have ingested data lately
+and which data connectors it has, caches them for a while, and joins them
+against each template's requiredDataConnectors. A template is deployable
+when it has no requirements or when any one of its required connectors
+is connected or has one of its data types ingesting; templates list
+alternative sources, any of which is enough for the rule to have data.
+Tables that merely exist, such as the empty built-in ones every
+workspace has, do not count.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+import src.app_logging as al
+
+# pylint: disable=W1203
+
+SOURCES_TTL = 600
+MODES = ("skip", "flag")
+# Tables with data in the Usage table over this span count as ingesting
+INGESTION_WINDOW = "P14D"
+INGESTED_TABLES_QUERY = "Usage | where Quantity > 0 | distinct DataType"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+@dataclass
+class WorkspaceSources:
+    """Ingesting tables and connector ids known in one workspace"""
+
+    workspace: object
+    tables: set[str] | None
+    connectors: set[str]
+    fetched_at: float = field(default_factory=time.monotonic)
+    checked: dict[str, bool] = field(default_factory=dict)
+
+    def has_table(self, name: str) -> bool:
+        """
+        Whether a table has ingested data. If that could not be queried the
+        table is looked up on its own once with get_table.
+        """
+        key = name.lower()
+        if self.tables is not None:
+            return key in self.tables
+        if key not in self.checked:
+            self.checked[key] = bool(self.workspace.get_table(name))
+        return self.checked[key]
+
+    def has_connector(self, connector_id: str) -> bool:
+        """Whether a data connector with this id is connected"""
+        return connector_id.lower() in self.connectors
+
+
+def connector_ids(connector: dict) -> set[str]:
+    """
+    Ids a template's connectorId may use for a workspace data connector:
+    its resource name, the id of its UI definition, its connector
+    definition, and for first-party connectors (no UI definition) the
+    kind, which is their id.
+    """
+    properties = connector.get("properties") or {}
+    ui_config = properties.get("connectorUiConfig") or {}
+    ids = {
+        connector.get("name"),
+        ui_config.get("id"),
+        properties.get("connectorDefinitionName"),
+    }
+    if not ui_config and not properties.get("connectorDefinitionName"):
+        ids.add(connector.get("kind"))
+    return {i.lower() for i in ids if i}
+
+
+def _fetch_sources(workspace) -> WorkspaceSources:
+    rows = workspace.query_logs(
+        INGESTED_TABLES_QUERY, timespan=INGESTION_WINDOW
+    )
+    table_names = (
+        {row[0].lower() for row in rows if row and row[0]}
+        if rows is not None
+        else None
+    )
+    connectors = set()
+    for connector in workspace.list_data_connectors():
+        connectors |= connector_ids(connector)
+    al.logger.info(
+        f"Workspace {workspace.workspace_name} has "
+        f"{len(table_names) if table_names is not None else 'unknown'} "
+        f"ingesting tables and {len(connectors)} data connector ids"
+    )
+    return WorkspaceSources(workspace, table_names, connectors)
+
+
+def workspace_sources(
+    workspace, ttl: float = SOURCES_TTL, refresh: bool = False
+) -> WorkspaceSources:
+    """The workspace's tables and connectors, cached for `ttl` seconds"""
+    key = (
+        workspace.subscription_id,
+        workspace.resource_group_name,
+        workspace.workspace_name,
+    )
+    with _cache_lock:
+        cached = _cache.get(key)
+        if (
+            cached is not None
+            and not refresh
+            and time.monotonic() - cached.fetched_at < ttl
+        ):
+            return cached
+    sources = _fetch_sources(workspace)
+    with _cache_lock:
+        _cache[key] = sources
+    return sources
+
+
+def missing_sources(template: dict, sources: WorkspaceSources) -> list[str]:
+    """
+    Connector ids a raw template needs but the workspace lacks. Empty when
+    the template has no requirements or any one of them is met.
+    """
+    required = template["properties"].get("requiredDataConnectors") or []
+    if not required:
+        return []
+    missing = []
+    for requirement in required:
+        connector_id = requirement.get("connectorId") or ""
+        if (connector_id and sources.has_connector(connector_id)) or any(
+            sources.has_table(data_type)
+            for data_type in requirement.get("dataTypes") or ()
+        ):
+            return []
+        missing.append(connector_id or "unknown")
+    return missing
+
+
+def check_template(template: dict, sources: WorkspaceSources) -> bool:
+    """Whether a raw template has a data source, logging it when not"""
+    lacking = missing_sources(template, sources)
+    if lacking:
+        al.logger.warning(
+            f"Template {template.get('name')} has no data source in "
+            f"{sources.workspace.workspace_name}, needs one of: "
+            f"{', '.join(lacking)}"
+        )
+    return not lacking
+
+
+def preflight_templates(
+    workspace, templates: list[dict], mode: str = "skip"
+) -> list[dict]:
+    """
+    Apply the pre-flight check to templates about to be deployed.
+
+    `mode` "skip" drops templates without data sources; "flag" keeps them
+    and only logs them.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown preflight mode: {mode}")
+    sources = workspace_sources(workspace)
+    ready = [t for t in templates if check_template(t, sources)]
+    al.logger.info(
+        f"{len(ready)} of {len(templates)} templates have data sources"
+    )
+    return ready if mode == "skip" else templates
@@ -0,0 +1,342 @@
+"""
+Query load estimate for a set of alert rules before they are deployed.
+
+Each Scheduled rule runs its query every queryFrequency over the last
+queryPeriod of data; NRT rules run every minute over the last minute. The
+rules are turned into columns (frequency, period and the tables each query
+reads) and totals are taken over whole columns: query executions per hour,
+minutes of data scanned per hour, and the same per table. Rules deployed
+together with the same frequency start and keep running in step, so
+frequencies shared by many rules are reported as hotspots with start
+offsets that spread them out, and rules scanning the same data many times
+over get a longer frequency suggested.
+"""
+
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable
+import src.app_logging as al
+import src.scheduled_rule as sr
+
+# pylint: disable=W1203, W0718
+
+NRT_MINUTES = 1.0
+# Rules sharing a frequency above which their runs should be staggered
+HOTSPOT_RULES = 20
+# Times each record may be scanned (period / frequency) before a longer
+# frequency is suggested
+MAX_OVERLAP = 48
+# Frequencies suggested in place of shorter ones, in minutes
+STANDARD_FREQUENCIES = (5, 10, 15, 30, 60, 120, 180, 360, 720, 1440)
+
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+QUERY_TOKEN = re.compile(
+    r"//[^\n]*"  # comments
+    r"|@'[^']*'|@\"[^\"]*\""  # verbatim strings
+    r"|'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\""  # strings
+    r"|[A-Za-z_][A-Za-z0-9_]*|[^\s/]|/"
+)
+# Words that start a statement without reading a table
+NOT_TABLES = frozenset(
+    {"let", "set", "declare", "alias", "print", "range", "datatable"}
+)
+# Operators whose arguments are tables or sub-queries
+SOURCE_OPERATORS = frozenset({"union", "join", "lookup"})
+
+
+def _query_tokens(query: str) -> list[str]:
+    """Tokens of a query with comments dropped and strings blanked"""
+    return [
+        '""' if token[0] in "'\"@" and len(token) > 1 else token
+        for token in QUERY_TOKEN.findall(query or "")
+        if not token.startswith("//")
+    ]
+
+
+def _lambda_parameters(tokens: list[str]) -> tuple[set[str], set[int]]:
+    """
+    Names and token positions of the parameter lists of functions defined
+    with let, e.g. `let f = (x:string, T:(y:int)) { ... }`.
+    """
+    names = set()
+    positions = set()
+    for start, token in enumerate(tokens):
+        if token != "(" or not start or tokens[start - 1] not in ("=", "view"):
+            continue
+        depth = 0
+        for end in range(start, len(tokens)):
+            depth += (tokens[end] == "(") - (tokens[end] == ")")
+            if not depth:
+                break
+        if end + 1 < len(tokens) and tokens[end + 1] == "{":
+            names.update(
+                tokens[i] for i in range(start, end) if tokens[i + 1] == ":"
+            )
+            positions.update(range(start, end + 1))
+    return names, positions
+
+
+def query_tables(query: str) -> tuple[str, ...]:
+    """
+    Tables a KQL query reads: the source of each statement, of each
+    function body and of each union, join and lookup, less names bound
+    with let and function parameters.
+    """
+    tokens = _query_tokens(query)
+    parameters, skipped = _lambda_parameters(tokens)
+    bound = parameters | {
+        name for keyword, name in zip(tokens, tokens[1:]) if keyword == "let"
+    }
+    tables = []
+    expecting = True
+    depth = 0
+    # Paren depth of the union whose argument list is being read
+    union_depth = None
+    for i, token in enumerate(tokens):
+        if i in skipped:
+            continue
+        previous = tokens[i - 1] if i else ";"
+        following = tokens[i + 1] if i + 1 < len(tokens) else ";"
+        depth += (token == "(") - (token == ")")
+        if token in ("|", ";") and depth == union_depth:
+            union_depth = None
+        keyword = token.lower()
+        if keyword == "union":
+            union_depth = depth
+        if token in (";", "{") or keyword in SOURCE_OPERATORS:
+            expecting = True
+        elif token == "," and previous == ")" and depth == union_depth:
+            # The next sub-query of a union
+            expecting = True
+        elif not expecting or token in ("(", ",", "=", "let", "view"):
+            continue
+        elif keyword in NOT_TABLES or not IDENTIFIER.fullmatch(token):
+            expecting = False
+        elif following in ("=", "("):
+            # A name being bound, an operator parameter or a function
+            continue
+        elif previous == "=" and tokens[i - 2] not in bound:
+            # The value of an operator parameter such as kind=inner
+            continue
+        else:
+            if token not in bound and token not in tables:
+                tables.append(token)
+            expecting = following == ","
+    return tuple(tables)
+
+
+@dataclass
+class RuleColumns:
+    """Alert rules as parallel columns, one entry per rule"""
+
+    names: list[str] = field(default_factory=list)
+    kinds: list[str] = field(default_factory=list)
+    frequency: list[float] = field(default_factory=list)
+    period: list[float] = field(default_factory=list)
+    tables: list[tuple[str, ...]] = field(default_factory=list)
+
+    @classmethod
+    def from_rules(cls, rules: Iterable) -> "RuleColumns":
+        """Columns of modeled Scheduled and NRT rules"""
+        columns = cls()
+        columns.add_rules(rules)
+        return columns
+
+    def add_rules(self, rules: Iterable) -> None:
+        """
+        Append modeled rules, e.g. one batch of a deployment at a time.
+        A rule whose schedule or query cannot be read is left out of the
+        estimate with a warning; the estimate never stops a deployment.
+        """
+        for rule in rules:
+            try:
+                properties = rule.properties
+                if rule.kind == "NRT":
+                    frequency = period = NRT_MINUTES
+                else:
+                    frequency = sr.duration_minutes(properties.queryFrequency)
+                    period = sr.duration_minutes(properties.queryPeriod)
+                if frequency <= 0 or period <= 0:
+                    raise ValueError("zero-length frequency or period")
+                tables = query_tables(properties.query)
+            except Exception as e:
+                al.logger.warning(
+                    f"Leaving {getattr(rule, 'name', None)} out of the "
+                    f"query load estimate: {e}"
+                )
+                continue
+            self.names.append(properties.displayName)
+            self.kinds.append(rule.kind)
+            self.frequency.append(frequency)
+            self.period.append(period)
+            self.tables.append(tables)
+
+
+@dataclass
+class TableLoad:
+    """Load one table takes from the rules reading it"""
+
+    rules: int = 0
+    executions_per_hour: float = 0.0
+    lookback_minutes_per_hour: float = 0.0
+
+
+@dataclass
+class Hotspot:
+    """Rules that share a frequency and so run in step"""
+
+    frequency: float
+    rules: list[str]
+    executions_per_hour: float
+    offsets: list[int]
+
+
+@dataclass
+class LoadReport:
+    """Estimated query load of a rule set"""
+
+    rules: int
+    executions_per_hour: float
+    lookback_minutes_per_hour: float
+    tables: dict[str, TableLoad]
+    frequencies: dict[float, int]
+    hotspots: list[Hotspot]
+    recommendations: list[str]
+
+
+def format_minutes(minutes: float) -> str:
+    """A number of minutes as the largest whole unit, e.g. 1h or 90m"""
+    for unit, size in (("d", 1440), ("h", 60)):
+        if minutes >= size and minutes % size == 0:
+            return f"{minutes // size:.0f}{unit}"
+    return f"{minutes:g}m"
+
+
+def stagger_offsets(count: int, frequency: float) -> list[int]:
+    """Start offsets in whole minutes spreading `count` runs over a period"""
+    return [int(i * frequency / count) for i in range(count)]
+
+
+def suggest_frequency(period: float, max_overlap: float = MAX_OVERLAP):
+    """Shortest standard frequency scanning each record at most so often"""
+    for frequency in STANDARD_FREQUENCIES:
+        if period / frequency <= max_overlap:
+            return frequency
+    return STANDARD_FREQUENCIES[-1]
+
+
+def estimate_load(
+    rules: Iterable,
+    hotspot_rules: int = HOTSPOT_RULES,
+    max_overlap: float = MAX_OVERLAP,
+    max_executions_per_hour: float = None,
+) -> LoadReport:
+    """
+    Estimate the query load of modeled alert rules and recommend changes.
+
+    `hotspot_rules` is how many rules may share a frequency before their
+    runs should be staggered, `max_overlap` how many times a rule may scan
+    each record before a longer frequency is suggested, and
+    `max_executions_per_hour` an optional budget for the whole set.
+    Takes the rules themselves or their RuleColumns.
+    """
+    if isinstance(rules, RuleColumns):
+        columns = rules
+    else:
+        columns = RuleColumns.from_rules(rules)
+    per_hour = [60 / f for f in columns.frequency]
+    lookback = [r * p for r, p in zip(per_hour, columns.period)]
+    overlap = [p / f for p, f in zip(columns.period, columns.frequency)]
+
+    tables = defaultdict(TableLoad)
+    for names, runs, minutes in zip(columns.tables, per_hour, lookback):
+        for name in names:
+            load = tables[name]
+            load.rules += 1
+            load.executions_per_hour += runs
+            load.lookback_minutes_per_hour += minutes
+
+    by_frequency = defaultdict(list)
+    for name, kind, frequency in zip(
+        columns.names, columns.kinds, columns.frequency
+    ):
+        if kind != "NRT":
+            by_frequency[frequency].append(name)
+
+    recommendations = []
+    hotspots = []
+    for frequency, names in sorted(by_frequency.items()):
+        if len(names) <= hotspot_rules:
+            continue
+        hotspots.append(
+            Hotspot(
+                frequency,
+                names,
+                len(names) * 60 / frequency,
+                stagger_offsets(len(names), frequency),
+            )
+        )
+        recommendations.append(
+            f"{len(names)} rules run every {format_minutes(frequency)} in "
+            f"step; stagger their first runs about "
+            f"{format_minutes(max(1, int(frequency / len(names))))} apart "
+            "or deploy them in waves"
+        )
+    overlapping = defaultdict(list)
+    for name, kind, frequency, period, times in zip(
+        columns.names,
+        columns.kinds,
+        columns.frequency,
+        columns.period,
+        overlap,
+    ):
+        if kind != "NRT" and times > max_overlap:
+            overlapping[frequency, period].append(name)
+    for (frequency, period), names in sorted(overlapping.items()):
+        recommendations.append(
+            f"{len(names)} rules (e.g. {names[0]}) run every "
+            f"{format_minutes(frequency)} over {format_minutes(period)}, "
+            f"scanning each record {period / frequency:.0f} times; run "
+            "them every "
+            f"{format_minutes(suggest_frequency(period, max_overlap))}"
+        )
+    total_runs = sum(per_hour)
+    if max_executions_per_hour and total_runs > max_executions_per_hour:
+        recommendations.append(
+            f"The rules run {total_runs:.0f} queries an hour, over the "
+            f"budget of {max_executions_per_hour:.0f}; lengthen the "
+            "frequency of the most frequent rules"
+        )
+    return LoadReport(
+        rules=len(columns.names),
+        executions_per_hour=total_runs,
+        lookback_minutes_per_hour=sum(lookback),
+        tables=dict(
+            sorted(
+                tables.items(),
+                key=lambda item: item[1].lookback_minutes_per_hour,
+                reverse=True,
+            )
+        ),
+        frequencies=dict(sorted(Counter(columns.frequency).items())),
+        hotspots=hotspots,
+        recommendations=recommendations,
+    )
+
+
+def log_load(report: LoadReport, workspace_name: str) -> None:
+    """Log a load estimate with its busiest tables and recommendations"""
+    al.logger.info(
+        f"{report.rules} rules for {workspace_name} would run "
+        f"{report.executions_per_hour:.0f} queries an hour over "
+        f"{report.lookback_minutes_per_hour / 60:.0f} hours of data"
+    )
+    for name, load in list(report.tables.items())[:5]:
+        al.logger.info(
+            f"Table {name}: {load.rules} rules, "
+            f"{load.executions_per_hour:.0f} queries an hour over "
+            f"{load.lookback_minutes_per_hour / 60:.0f} hours of data"
+        )
+    for recommendation in report.recommendations:
+        al.logger.warning(recommendation)
@@ -0,0 +1,162 @@
+"""
+Local mirror of the Azure Sentinel repo's Solutions rules.
+
+The mirror keeps the rule YAMLs and their parsed form on disk, tagged with
+the commit they came from. Refreshing compares that commit with the new
+head and only fetches and re-parses the rule files that changed, falling
+back to one tarball download when there is no usable base commit.
+"""
+
+import copy
+import pickle
+from pathlib import Path
+import requests
+import app_logging as al
+import atomic_file as af
+import repo_work as rw
+import yaml_parse as yp
+
+# pylint: disable=W1203, W0718
+
+INDEX_VERSION = 1
+# GitHub's compare API lists at most this many changed files
+COMPARE_FILE_LIMIT = 300
+
+
+class RepoMirror:
+    """On-disk mirror of the Solutions rule YAMLs at one commit"""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.files_dir = self.root / "files"
+        self.index_path = self.root / "index.pickle"
+        self.sha = None
+        self.rules = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Load the parsed index, ignoring a missing or outdated one"""
+        try:
+            with open(self.index_path, "rb") as f:
+                index = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            al.logger.warning(f"Ignoring unreadable mirror index: {e}")
+            return
+        if index.get("version") == INDEX_VERSION:
+            self.sha = index["sha"]
+            self.rules = index["rules"]
+
+    def _save(self) -> None:
+        """Persist the parsed index"""
+        index = {
+            "version": INDEX_VERSION,
+            "sha": self.sha,
+            "rules": self.rules,
+        }
+        af.atomic_write(self.index_path, pickle.dumps(index))
+
+    def _put(self, path: str, data: bytes, parsed: yp.ParseResult = None):
+        """Store and parse one rule file"""
+        parsed = parsed or yp.parse_blob((path, data))
+        if parsed.error is not None:
+            al.logger.error(f"Error decoding YAML in {path}: {parsed.error}")
+            self._remove(path)
+            return
+        af.atomic_write(self.files_dir / path, data)
+        self.rules[path] = parsed.data
+
+    def _remove(self, path: str) -> None:
+        """Drop one rule file"""
+        self.rules.pop(path, None)
+        (self.files_dir / path).unlink(missing_ok=True)
+
+    def full_sync(self, repo, sha: str) -> int:
+        """Replace the mirror with the rules from a tarball of `sha`"""
+        al.logger.info(f"Full mirror sync of {rw.SENTINEL_REPO} at {sha}")
+        url = repo.get_archive_link("tarball", sha)
+        with requests.get(url, stream=True, timeout=300) as response:
+            response.raise_for_status()
+            stale = set(self.rules)
+            for files in yp.chunked(rw.iter_archive_rule_files(response.raw)):
+                for (path, data), parsed in zip(files, yp.parse_blobs(files)):
+                    self._put(path, data, parsed)
+                    stale.discard(path)
+        for path in stale:
+            self._remove(path)
+        self.sha = sha
+        self._save()
+        return len(self.rules)
+
+    def incremental_sync(self, repo, sha: str) -> int | None:
+        """
+        Apply the rule file changes between the mirrored commit and `sha`.
+        Returns the number of changed rule files, or None when the compare
+        cannot be trusted and a full sync is needed instead: `sha` is not
+        strictly ahead of the mirror (an older or diverged ref) or the
+        change list is too large.
+        """
+        comparison = repo.compare(self.sha, sha)
+        if comparison.status != "ahead" or comparison.behind_by:
+            al.logger.info(
+                f"{sha} is {comparison.status} of mirrored {self.sha}"
+            )
+            return None
+        files = list(comparison.files)
+        if len(files) >= COMPARE_FILE_LIMIT:
+            return None
+        changed = 0
+        for file in files:
+            previous = getattr(file, "previous_filename", None)
+            if previous and rw.is_rule_path(previous):
+                self._remove(previous)
+                changed += 1
+            if not rw.is_rule_path(file.filename):
+                continue
+            changed += 1
+            if file.status == "removed":
+                self._remove(file.filename)
+            else:
+                content = repo.get_contents(file.filename, ref=sha)
+                self._put(file.filename, content.decoded_content)
+        self.sha = sha
+        self._save()
+        return changed
+
+    def refresh(self, repo, ref: str = None) -> str:
+        """Bring the mirror up to `ref` (default branch head) and return it"""
+        sha = repo.get_commit(ref or repo.default_branch).sha
+        if sha == self.sha:
+            al.logger.info(f"Mirror already at {sha}")
+            return sha
+        changed = None
+        if self.sha is not None:
+            try:
+                changed = self.incremental_sync(repo, sha)
+            except Exception as e:
+                al.logger.warning(f"Incremental mirror sync failed: {e}")
+        if changed is None:
+            self.full_sync(repo, sha)
+        else:
+            al.logger.info(f"Mirror updated to {sha}: {changed} rule files")
+        return sha
+
+    def get_rules(self, reformat=True, include: list = None) -> list[dict]:
+        """Rules in the mirror, optionally limited to some solutions"""
+        rules = []
+        for path, parsed in self.rules.items():
+            if include and path.split("/")[1] not in include:
+                continue
+            if parsed is None:
+                continue
+            rule = copy.deepcopy(parsed)
+            if reformat:
+                try:
+                    rule = rw.change_template_format(rule)
+                except (AttributeError, TypeError) as e:
+                    al.logger.error(f"Error reformatting {path}: {e}")
+                    continue
+            rules.append(rule)
+        al.logger.info(f"Total rules found: {len(rules)}")
+        return rules
@@ -1,11 +1,18 @@
 """Work with contents of the Azure Sentinel repo."""
 
 import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from github import Github, Auth
+import requests
 import yaml
 import app_logging as al
-import scheduled_rule_template as srt
-import nrt_rule_template as nrt
+import rule_batch as rb
+import yaml_parse as yp
 
 # pylint: disable=W1203, W0718
 
@@ -58,31 +65,111 @@ def change_template_format(template_dict: dict) -> dict:
     return template_dict
 
 
-def yaml_rules_2_dictionary(contents, reformat, repo) -> list[dict]:
-    """Convert YAML rules from repo to dictionary format."""
+class RateLimitGate:
+    """
+    Holds GitHub calls back when the core rate limit runs low.
+
+    Reads the remaining quota and reset time PyGithub keeps from the
+    X-RateLimit-* headers of the last response, so it costs no extra call.
+    """
+
+    def __init__(self, repo, reserve: int = 50, max_sleep: float = 900):
+        self.requester = getattr(repo, "requester", None)
+        self.reserve = reserve
+        self.max_sleep = max_sleep
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until it is safe to make another call"""
+        if self.requester is None:
+            return
+        with self.lock:
+            remaining, _ = self.requester.rate_limiting
+            if remaining < 0 or remaining > self.reserve:
+                return
+            delay = self.requester.rate_limiting_resettime - time.time() + 1
+            if delay <= 0:
+                return
+            delay = min(delay, self.max_sleep)
+            al.logger.warning(
+                f"GitHub rate limit low ({remaining} left), "
+                f"pausing {delay:.0f}s"
+            )
+            time.sleep(delay)
+
+
+def _parse_rule_content(content, reformat, gate):
+    """Fetch and parse one rule file"""
+    gate.wait()
+    try:
+        yaml_data = yp.load(content.decoded_content)
+        if reformat:
+            yaml_data = change_template_format(yaml_data)
+        return yaml_data
+    except yaml.YAMLError as e:
+        al.logger.error(f"Error decoding YAML in {content.path}: {e}")
+        return None
+
+
+def _list_dir(repo, path, gate):
+    """List one directory"""
+    gate.wait()
+    al.logger.info(f"Found sub-directory: {path}")
+    return repo.get_contents(path)
+
+
+def yaml_rules_2_dictionary(
+    contents, reformat, repo, workers: int = 4, gate=None
+) -> list[dict]:
+    """
+    Convert YAML rules from repo to dictionary format.
+
+    Walks the folder breadth first, with directory listings and file
+    fetches spread over `workers` threads.
+    """
+    gate = gate or RateLimitGate(repo)
     rules = []
-    while contents:
-        content = contents.pop(0)
-        # for content in contents:
-        if content.type == "file" and content.name.endswith((".yaml", ".yml")):
-            try:
-                yaml_data = yaml.safe_load(content.decoded_content.decode())
-                if reformat:
-                    yaml_data = change_template_format(yaml_data)
-                rules.append(yaml_data)
-            except yaml.YAMLError as e:
-                al.logger.error(f"Error decoding YAML in {content.path}: {e}")
-        if content.type == "dir":
-            al.logger.info(f"Found sub-directory: {content.path}")
-            contents.extend(repo.get_contents(content.path))
-    return rules
+    frontier = deque(contents)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while frontier or pending:
+            while frontier:
+                content = frontier.popleft()
+                if content.type == "file" and content.name.endswith(
+                    (".yaml", ".yml")
+                ):
+                    future = pool.submit(
+                        _parse_rule_content, content, reformat, gate
+                    )
+                elif content.type == "dir":
+                    future = pool.submit(_list_dir, repo, content.path, gate)
+                else:
+                    continue
+                pending[future] = content
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                content = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    al.logger.error(f"Error fetching {content.path}: {e}")
+                    continue
+                if content.type == "dir":
+                    frontier.extend(result)
+                elif result is not None:
+                    rules.append((content.path, result))
+    rules.sort(key=lambda item: item[0])
+    return [rule for _, rule in rules]
 
 
-def get_rules_for_solution(repo, solution_contents, reformat):
+def get_rules_for_solution(
+    repo, solution_contents, reformat, workers: int = 4, gate=None
+):
     """Get rules for a solution in the repo."""
     for content in solution_contents:
         if (
-            "analytic" in content.name.lower() or "rule" in content.name.lower()
+            "analytic" in content.name.lower()
+            or "rule" in content.name.lower()
         ) and content.type == "dir":
             al.logger.info(f"Found Analytic folder in {content.path}")
             if content.name != "Analytic Rules":
@@ -90,7 +177,11 @@ def get_rules_for_solution(repo, solution_contents, reformat):
                     f"Improperly formatted folder name: {content.path}"
                 )
             solution_rules = yaml_rules_2_dictionary(
-                repo.get_contents(content.path), reformat, repo
+                repo.get_contents(content.path),
+                reformat,
+                repo,
+                workers=workers,
+                gate=gate,
             )
             return solution_rules
     solution_name = solution_contents[0].path.split("/")[1]
@@ -98,16 +189,137 @@ def get_rules_for_solution(repo, solution_contents, reformat):
     return
 
 
-def get_rules_from_repo(reformat=True, include: list = None) -> list[dict]:
-    """Get rules from the Azure Sentinel repo Solutions."""
+def is_rule_path(path: str, include: list = None) -> bool:
+    """Whether a repo path is a rule YAML in a Solution's analytic folder."""
+    parts = path.split("/")
+    if (
+        len(parts) < 4
+        or parts[0] != REPO_FOLDER
+        or not parts[-1].endswith((".yaml", ".yml"))
+    ):
+        return False
+    if include and parts[1] not in include:
+        return False
+    folder = parts[2].lower()
+    return "analytic" in folder or "rule" in folder
+
+
+def iter_archive_rule_files(archive, include: list = None):
+    """
+    Yield (repo path, file bytes) for each rule YAML in a repo archive.
+
+    `archive` is a path to a .tar.gz/.tar/.zip or a file object holding a
+    tarball. Tarballs are read as a stream, so a download can be passed
+    straight in. The archive's top-level folder (e.g. the
+    "Azure-Azure-Sentinel-<sha>/" folder GitHub adds) is stripped.
+    """
+    if isinstance(archive, (str, os.PathLike)) and str(archive).endswith(
+        ".zip"
+    ):
+        with zipfile.ZipFile(archive) as zf:
+            for info in zf.infolist():
+                path = info.filename.split("/", 1)[-1]
+                if not info.is_dir() and is_rule_path(path, include):
+                    yield path, zf.read(info)
+        return
+    if isinstance(archive, (str, os.PathLike)):
+        tar = tarfile.open(archive, mode="r:*")
+    else:
+        tar = tarfile.open(fileobj=archive, mode="r|*")
+    with tar:
+        for member in tar:
+            path = member.name.split("/", 1)[-1]
+            if member.isfile() and is_rule_path(path, include):
+                yield path, tar.extractfile(member).read()
+
+
+def rules_from_archive(archive, reformat=True, include: list = None):
+    """Read the Solutions rules out of a local or streamed repo archive."""
+    rules = []
+    for result in yp.parse_blobs(iter_archive_rule_files(archive, include)):
+        if result.error is not None:
+            al.logger.error(
+                f"Error decoding YAML in {result.source}: {result.error}"
+            )
+            continue
+        if result.data is None:
+            al.logger.warning(f"Skipping empty YAML in {result.source}")
+            continue
+        try:
+            rules.append(
+                change_template_format(result.data)
+                if reformat
+                else result.data
+            )
+        except (AttributeError, TypeError) as e:
+            al.logger.error(f"Error reformatting {result.source}: {e}")
+    al.logger.info(f"Total rules found: {len(rules)}")
+    return rules
+
+
+def get_rules_from_tarball(repo, reformat=True, include=None, ref=None):
+    """Stream one tarball of the repo and read the rules from it."""
+    url = repo.get_archive_link("tarball", ref) if ref else None
+    url = url or repo.get_archive_link("tarball")
+    al.logger.info(f"Downloading {SENTINEL_REPO} tarball")
+    with requests.get(url, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        return rules_from_archive(response.raw, reformat, include)
+
+
+def get_sentinel_repo(pool_size: int = None):
+    """
+    Connect to the Azure Sentinel repo with GITHUB_TOKEN.
+    Pass `pool_size` to share the connection between that many threads.
+    """
     token = os.getenv("GITHUB_TOKEN")
     if token is None:
         al.logger.error("GITHUB_TOKEN environment variable not set")
-        return []
+        return None
     auth = Auth.Token(token)
-    g = Github(auth=auth)
+    if pool_size:
+        # RateLimitGate paces concurrent callers instead of a fixed delay
+        g = Github(auth=auth, pool_size=pool_size, seconds_between_requests=0)
+    else:
+        g = Github(auth=auth)
+    return g.get_repo(SENTINEL_REPO)
+
+
+def get_rules_from_repo(
+    reformat=True,
+    include: list = None,
+    source: str = "contents",
+    archive=None,
+    ref: str = None,
+    mirror=None,
+    workers: int = 4,
+    solution_workers: int = 4,
+) -> list[dict]:
+    """
+    Get rules from the Azure Sentinel repo Solutions.
+
+    source="contents" walks the repo with one API call per folder and file,
+    `solution_workers` solutions at a time with `workers` threads each.
+    source="tarball" downloads a single tarball of `ref` instead.
+    A local `archive` is read offline and needs no token.
+    A repo_mirror.RepoMirror is synced to `ref` and serves the rules.
+    """
+    if archive is not None:
+        return rules_from_archive(archive, reformat, include)
+    repo = get_sentinel_repo(pool_size=workers * solution_workers)
+    if mirror is not None:
+        if repo is not None:
+            mirror.refresh(repo, ref)
+        else:
+            al.logger.warning(
+                f"Serving mirror at {mirror.sha} without refresh"
+            )
+        return mirror.get_rules(reformat, include)
+    if repo is None:
+        return []
     al.logger.info("Starting to process solutions...")
-    repo = g.get_repo(SENTINEL_REPO)
+    if source == "tarball":
+        return get_rules_from_tarball(repo, reformat, include, ref)
     solutions = repo.get_contents(REPO_FOLDER)
     rules = []
     if include:
@@ -115,38 +327,51 @@ def get_rules_from_repo(reformat=True, include: list = None) -> list[dict]:
         solutions = [
             solution for solution in solutions if solution.name in include
         ]
-    for solution in solutions:
+    gate = RateLimitGate(repo)
+
+    def process(solution):
         al.logger.info(f"Processing {solution.name}...")
         try:
-            rules.extend(
-                get_rules_for_solution(
-                    repo, repo.get_contents(solution.path), reformat
-                )
+            gate.wait()
+            return get_rules_for_solution(
+                repo,
+                repo.get_contents(solution.path),
+                reformat,
+                workers=workers,
+                gate=gate,
             )
         except Exception as e:
             if "NoneType" not in str(e):
                 al.logger.error(f"Error processing {solution.name}: {e}")
 
+    with ThreadPoolExecutor(max_workers=solution_workers) as pool:
+        for solution_rules in pool.map(process, solutions):
+            rules.extend(solution_rules or [])
+
     al.logger.info(f"Total rules found: {len(rules)}")
     return rules
 
 
-def model_rules_from_repo(reformat=True, include: list = None):
+def model_rules_from_repo(
+    reformat=True,
+    include: list = None,
+    source: str = "contents",
+    archive=None,
+    ref: str = None,
+    mirror=None,
+):
     """Get rules from repo and model them."""
-    rules = get_rules_from_repo(reformat=reformat, include=include)
-    modeled_rules = []
-    for rule in rules:
-        try:
-            al.logger.debug(f"Modeling rule {rule['name']}")
-            if rule["kind"] == "NRT":
-                modeled_rules.append(nrt.NrtRuleTemplate(**rule))
-            elif rule["kind"] == "Scheduled":
-                modeled_rules.append(srt.ScheduledAlertRuleTemplate(**rule))
-            else:
-                al.logger.warning(f"{rule['kind']} for rule {rule['name']}")
-        except Exception as e:
-            al.logger.error(
-                f"Error creating ScheduledAlertRuleTemplate {rule['name']}: {e}"
-            )
-            continue
-    return modeled_rules
+    rules = get_rules_from_repo(
+        reformat=reformat,
+        include=include,
+        source=source,
+        archive=archive,
+        ref=ref,
+        mirror=mirror,
+    )
+    result = rb.validate_templates(rules)
+    for error in result.errors:
+        al.logger.error(
+            f"Error creating {error.kind} template {error.name}: {error.message}"
+        )
+    return result.models
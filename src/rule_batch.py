@@ -0,0 +1,135 @@
+"""
+Batch modeling of rule templates and rules.
+
+Validates a whole list of raw dicts in one call against a discriminated
+union of the Scheduled and NRT models, using validators built once at
+import time. Returns the models that validated plus a per-index error
+report for the ones that did not.
+"""
+
+from dataclasses import dataclass, field
+from typing import Annotated, Union
+from pydantic import Field, TypeAdapter, ValidationError, WrapValidator
+import src.app_logging as al
+import src.scheduled_rule as sr
+import src.scheduled_rule_template as srt
+import src.nrt_rule as nr
+import src.nrt_rule_template as nrt
+
+# pylint: disable=W1203, W0718
+
+TemplateModel = Annotated[
+    Union[srt.ScheduledAlertRuleTemplate, nrt.NrtRuleTemplate],
+    Field(discriminator="kind"),
+]
+RuleModel = Annotated[
+    Union[sr.ScheduledAlertRule, nr.NrtAlertRule],
+    Field(discriminator="kind"),
+]
+
+
+@dataclass
+class BatchError:
+    """Why the item at `index` of a batch failed to validate"""
+
+    index: int
+    name: str | None
+    kind: str | None
+    message: str
+
+
+@dataclass
+class BatchResult:
+    """Models that validated, in input order, and errors for the rest"""
+
+    models: list = field(default_factory=list)
+    errors: list[BatchError] = field(default_factory=list)
+
+
+def _describe(item, message: str, index: int) -> BatchError:
+    """Build a BatchError for a raw item"""
+    if isinstance(item, dict):
+        return BatchError(index, item.get("name"), item.get("kind"), message)
+    return BatchError(index, None, None, message)
+
+
+def _format_errors(errors: list[dict]) -> str:
+    """Render pydantic error dicts for one item as a single line"""
+    return "; ".join(
+        (
+            ".".join(str(part) for part in error["loc"]) + f": {error['msg']}"
+            if error["loc"]
+            else error["msg"]
+        )
+        for error in errors
+    )
+
+
+class _Invalid:
+    """Stands in for an item that failed validation inside a batch"""
+
+    __slots__ = ("message",)
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def _capture_errors(value, handler):
+    """Wrap validator that turns a failed item into an _Invalid marker"""
+    try:
+        return handler(value)
+    except ValidationError as e:
+        return _Invalid(_format_errors(e.errors(include_url=False)))
+    except Exception as e:
+        return _Invalid(str(e))
+
+
+class BatchValidator:
+    """Prebuilt list validator for one discriminated union"""
+
+    def __init__(self, model, kinds: tuple[str, ...]):
+        self.adapter = TypeAdapter(
+            list[Annotated[model, WrapValidator(_capture_errors)]]
+        )
+        self.kinds = frozenset(kinds)
+
+    def validate(self, items: list) -> BatchResult:
+        """
+        Validate `items` in one call.
+
+        A failing item does not abort the batch: it is reported by index
+        and every other item is still modeled in the same pass. Items of a
+        kind without a model, e.g. Fusion, are logged and skipped.
+        """
+        result = BatchResult()
+        positions = []
+        for index, item in enumerate(items):
+            if isinstance(item, dict) and item.get("kind") not in self.kinds:
+                al.logger.warning(
+                    f"{item.get('kind')} for rule {item.get('name')}"
+                )
+            else:
+                positions.append(index)
+        validated = self.adapter.validate_python([items[i] for i in positions])
+        for index, model in zip(positions, validated):
+            if isinstance(model, _Invalid):
+                result.errors.append(
+                    _describe(items[index], model.message, index)
+                )
+            else:
+                result.models.append(model)
+        return result
+
+
+TEMPLATES = BatchValidator(TemplateModel, ("Scheduled", "NRT"))
+RULES = BatchValidator(RuleModel, ("Scheduled", "NRT"))
+
+
+def validate_templates(templates: list[dict]) -> BatchResult:
+    """Model a list of raw rule templates"""
+    return TEMPLATES.validate(templates)
+
+
+def validate_rules(rules: list[dict]) -> BatchResult:
+    """Model a list of raw alert rules"""
+    return RULES.validate(rules)
@@ -0,0 +1,209 @@
+"""
+Bulk export and import of a workspace's alert rules and rule templates.
+
+Records are the raw ARM JSON objects. They are written as gzip compressed
+JSONL, one record per line, or optionally as Parquet with a few flat
+columns for querying plus the full record. Writes are buffered in chunks
+and reads stream one record at a time, so a catalog is never held in
+memory as a whole. Import models the records chunk by chunk and hands
+them to create_update_alerts.
+"""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Iterable, Iterator
+from pydantic import BaseModel
+import src.app_logging as al
+import src.atomic_file as af
+import src.rule_batch as rb
+import src.rule_serialization as rs
+import src.template_to_rule as ttr
+import src.yaml_parse as yp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = None
+    pq = None
+
+# pylint: disable=W1203
+
+CHUNK_SIZE = 500
+ALERT_RULES_FILE = "alert_rules"
+TEMPLATES_FILE = "rule_templates"
+
+
+def _record(item) -> dict:
+    """Raw dict for a record that may be a model"""
+    if isinstance(item, BaseModel):
+        return item.model_dump(mode="json")
+    return item
+
+
+def write_jsonl(
+    records: Iterable, path: str | Path, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Write records to a JSONL file, gzip compressed if it ends in .gz.
+
+    Returns the number of records written.
+    """
+    path = Path(path)
+    written = 0
+    with af.atomic_open(path) as raw:
+        with gzip.open(raw, "wb") if path.suffix == ".gz" else raw as f:
+            for chunk in yp.chunked(records, chunk_size):
+                f.write(
+                    b"".join(
+                        json.dumps(
+                            _record(item), separators=(",", ":")
+                        ).encode()
+                        + b"\n"
+                        for item in chunk
+                    )
+                )
+                written += len(chunk)
+    return written
+
+
+def iter_jsonl(path: str | Path) -> Iterator[dict]:
+    """Stream the records of a JSONL file, gzip compressed or not"""
+    path = Path(path)
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+
+
+def _parquet_schema():
+    return pa.schema(
+        [
+            ("name", pa.string()),
+            ("kind", pa.string()),
+            ("displayName", pa.string()),
+            ("severity", pa.string()),
+            ("enabled", pa.bool_()),
+            ("record", pa.string()),
+        ]
+    )
+
+
+def _parquet_row(record: dict) -> dict:
+    properties = record.get("properties") or {}
+    main_template = properties.get("mainTemplate")
+    if main_template:
+        properties = main_template["resources"][0].get("properties") or {}
+    return {
+        "name": record.get("name"),
+        "kind": record.get("kind"),
+        "displayName": properties.get("displayName"),
+        "severity": properties.get("severity"),
+        "enabled": properties.get("enabled"),
+        "record": json.dumps(record, separators=(",", ":")),
+    }
+
+
+def write_parquet(
+    records: Iterable, path: str | Path, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Write records to a Parquet file, one row group per chunk.
+
+    The name, kind, displayName, severity and enabled columns are for
+    querying; the full record is kept as JSON in `record`.
+    """
+    _require_pyarrow()
+    schema = _parquet_schema()
+    written = 0
+    with af.atomic_open(Path(path)) as f:
+        with pq.ParquetWriter(f, schema, compression="zstd") as writer:
+            for chunk in yp.chunked(records, chunk_size):
+                rows = [_parquet_row(_record(item)) for item in chunk]
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                written += len(rows)
+    return written
+
+
+def iter_parquet(path: str | Path) -> Iterator[dict]:
+    """Stream the records of a Parquet export"""
+    _require_pyarrow()
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(columns=["record"]):
+        for record in batch.column(0).to_pylist():
+            yield json.loads(record)
+
+
+def iter_records(path: str | Path) -> Iterator[dict]:
+    """Stream the records of an export in either format"""
+    if Path(path).suffix == ".parquet":
+        return iter_parquet(path)
+    return iter_jsonl(path)
+
+
+def export_workspace(
+    workspace, out_dir: str | Path, fmt: str = "jsonl"
+) -> dict:
+    """
+    Export a workspace's alert rules and rule content templates.
+
+    `fmt` is "jsonl" (gzip compressed) or "parquet". Returns the number of
+    records written per file.
+    """
+    if fmt == "jsonl":
+        writer, suffix = write_jsonl, ".jsonl.gz"
+    elif fmt == "parquet":
+        writer, suffix = write_parquet, ".parquet"
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    out_dir = Path(out_dir)
+    counts = {}
+    for name, records in (
+        (ALERT_RULES_FILE, workspace.list_alert_rules()),
+        (TEMPLATES_FILE, workspace.iter_rule_content_templates()),
+    ):
+        path = out_dir / f"{name}{suffix}"
+        counts[path.name] = writer(records, path)
+        al.logger.info(f"Exported {counts[path.name]} records to {path}")
+    return counts
+
+
+def import_rules(
+    workspace,
+    path: str | Path,
+    enabled: bool | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> list:
+    """
+    Create or update the alert rules of an export in `workspace`.
+
+    Rules keep their names, so importing into the workspace they came from
+    updates them in place. `enabled` overrides the exported state when
+    set. Kinds without a model, e.g. Fusion, are skipped.
+    """
+    responses = []
+    skipped = 0
+    for chunk in yp.chunked(iter_records(path), chunk_size):
+        supported = [r for r in chunk if r.get("kind") in ttr.RULE_MODELS]
+        skipped += len(chunk) - len(supported)
+        result = rb.validate_rules(supported)
+        for error in result.errors:
+            al.logger.error(
+                f"Error modeling {error.kind} rule {error.name}: {error.message}"
+            )
+        responses.extend(
+            workspace.create_update_alerts(
+                result.models,
+                bodies=rs.rule_bodies(result.models, enabled=enabled),
+            )
+        )
+    if skipped:
+        al.logger.info(f"Skipped {skipped} rules of unsupported kinds")
+    return responses
@@ -0,0 +1,159 @@
+"""
+In-memory inverted index over rule templates.
+
+Maps tactics, techniques, required data connectors and data types,
+severity, status, kind and display name tokens to the positions of the
+templates carrying them, so a subset of a catalog can be selected without
+scanning it. Works on template models and on raw template dicts alike.
+
+Within one filter the values are alternatives; across filters they must
+all match. Display name text matches templates containing every token.
+"""
+
+import re
+from collections import defaultdict
+from typing import Iterable
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+FIELDS = (
+    "tactics",
+    "techniques",
+    "connectors",
+    "data_types",
+    "severities",
+    "statuses",
+    "kinds",
+)
+
+
+def _get(item, key: str):
+    """Attribute of a model or key of a dict"""
+    if isinstance(item, dict):
+        return item.get(key)
+    return getattr(item, key, None)
+
+
+def _norm(value) -> str:
+    """Index key for a value, enums and case folded"""
+    return str(getattr(value, "value", value)).strip().lower()
+
+
+def tokens(text: str | None) -> set[str]:
+    """Lower-cased alphanumeric tokens of a display name or query"""
+    return set(TOKEN.findall((text or "").lower()))
+
+
+def _technique_keys(values) -> set[str]:
+    """Techniques plus the parent of each sub-technique"""
+    keys = set()
+    for value in values or ():
+        key = _norm(value)
+        keys.add(key)
+        keys.add(key.split(".", 1)[0])
+    return keys
+
+
+def _entry_keys(template) -> dict[str, set[str]]:
+    """Index keys per field for one template"""
+    properties = _get(template, "properties") or {}
+    connectors = _get(properties, "requiredDataConnectors") or ()
+    return {
+        "tactics": {_norm(t) for t in _get(properties, "tactics") or ()},
+        "techniques": _technique_keys(
+            [
+                *(_get(properties, "techniques") or ()),
+                *(_get(properties, "subTechniques") or ()),
+            ]
+        ),
+        "connectors": {
+            _norm(_get(c, "connectorId"))
+            for c in connectors
+            if _get(c, "connectorId")
+        },
+        "data_types": {
+            _norm(data_type)
+            for c in connectors
+            for data_type in _get(c, "dataTypes") or ()
+        },
+        "severities": {_norm(_get(properties, "severity"))},
+        "statuses": {_norm(_get(properties, "status"))},
+        "kinds": {_norm(_get(template, "kind"))},
+        "text": tokens(_get(properties, "displayName")),
+    }
+
+
+def _wanted(filters: dict) -> dict[str, set[str]]:
+    """Index keys wanted per field, the given filters validated"""
+    unknown = filters.keys() - set(FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown rule filters: {sorted(unknown)}")
+    wanted = {}
+    for field, values in filters.items():
+        if not values:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        wanted[field] = {_norm(v) for v in values}
+    return wanted
+
+
+def template_filter(text: str = None, **filters):
+    """
+    The RuleIndex filters as a predicate on one template, for templates
+    that arrive one at a time rather than as a catalog.
+    """
+    wanted = _wanted(filters)
+    words = tokens(text)
+
+    def matches(template) -> bool:
+        keys = _entry_keys(template)
+        return words <= keys["text"] and all(
+            keys[field] & values for field, values in wanted.items()
+        )
+
+    return matches
+
+
+class RuleIndex:
+    """Inverted index over a list of rule templates"""
+
+    def __init__(self, templates: Iterable):
+        self.templates = list(templates)
+        self.postings = {
+            field: defaultdict(set) for field in (*FIELDS, "text")
+        }
+        for position, template in enumerate(self.templates):
+            for field, keys in _entry_keys(template).items():
+                for key in keys:
+                    self.postings[field][key].add(position)
+
+    def values(self, field: str) -> dict[str, int]:
+        """Indexed values of a field with how many templates carry each"""
+        return {
+            key: len(positions)
+            for key, positions in sorted(self.postings[field].items())
+            if key != "none"
+        }
+
+    def positions(self, text: str = None, **filters) -> set[int]:
+        """Positions of the templates matching every given filter"""
+        candidate_sets = []
+        for field, keys in _wanted(filters).items():
+            postings = self.postings[field]
+            candidate_sets.append(
+                set().union(*(postings.get(key, ()) for key in keys))
+            )
+        for token in tokens(text):
+            candidate_sets.append(self.postings["text"].get(token, set()))
+        if not candidate_sets:
+            return set(range(len(self.templates)))
+        candidate_sets.sort(key=len)
+        return candidate_sets[0].intersection(*candidate_sets[1:])
+
+    def search(self, text: str = None, **filters) -> list:
+        """Templates matching every given filter, in catalog order"""
+        return [
+            self.templates[position]
+            for position in sorted(self.positions(text, **filters))
+        ]
@@ -0,0 +1,142 @@
+"""
+Streaming pipeline of threaded stages joined by bounded queues.
+
+Items flow from a source iterable through each stage in turn, every stage
+running in its own worker threads, so the first item can reach the last
+stage while later ones are still being fetched. The queues between stages
+hold at most `queue_size` items; a slow stage makes the earlier ones wait
+rather than pile items up, keeping memory flat however long the source.
+
+A stage function returns the item to pass on, or None to drop it. An
+exception in the source or a stage stops the pipeline and is raised to
+the consumer once the threads have finished.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+QUEUE_SIZE = 64
+# How often blocked threads check whether the pipeline was stopped
+POLL_SECONDS = 0.1
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline and how many threads run it"""
+
+    name: str
+    func: Callable[[object], object]
+    workers: int = 1
+
+
+class _Pipeline:
+    """Threads and queues of one run"""
+
+    def __init__(self, stage_count: int, queue_size: int):
+        self.queues = [
+            queue.Queue(maxsize=queue_size) for _ in range(stage_count + 1)
+        ]
+        self.stop = threading.Event()
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def put(self, index: int, item) -> bool:
+        """Put an item on a queue unless the pipeline stops first"""
+        while not self.stop.is_set():
+            try:
+                self.queues[index].put(item, timeout=POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, index: int):
+        """Take an item from a queue, or _DONE if the pipeline stops"""
+        while not self.stop.is_set():
+            try:
+                return self.queues[index].get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def fail(self, error: Exception) -> None:
+        """Record an error and stop every thread"""
+        with self.lock:
+            self.errors.append(error)
+        self.stop.set()
+
+
+def _feed(pipeline: _Pipeline, source: Iterable) -> None:
+    try:
+        for item in source:
+            if not pipeline.put(0, item):
+                return
+    except Exception as e:  # pylint: disable=W0718
+        pipeline.fail(e)
+    pipeline.put(0, _DONE)
+
+
+def _work(pipeline: _Pipeline, index: int, stage: Stage, remaining: list):
+    """Run one worker of a stage until its input is exhausted"""
+    while True:
+        item = pipeline.get(index)
+        if item is _DONE:
+            # Let the stage's other workers see the end too
+            pipeline.put(index, _DONE)
+            break
+        try:
+            result = stage.func(item)
+        except Exception as e:  # pylint: disable=W0718
+            pipeline.fail(e)
+            break
+        if result is not None and not pipeline.put(index + 1, result):
+            break
+    with pipeline.lock:
+        remaining[0] -= 1
+        last = remaining[0] == 0
+    if last:
+        pipeline.put(index + 1, _DONE)
+
+
+def run_pipeline(
+    source: Iterable, stages: list[Stage], queue_size: int = QUEUE_SIZE
+) -> Iterator:
+    """
+    Yields what the last stage returns for each item of `source`, in the
+    order items finish. Closing the generator early stops the pipeline.
+    """
+    pipeline = _Pipeline(len(stages), queue_size)
+    threads = [
+        threading.Thread(
+            target=_feed, args=(pipeline, source), name="pipeline-source"
+        )
+    ]
+    for index, stage in enumerate(stages):
+        remaining = [stage.workers]
+        threads += [
+            threading.Thread(
+                target=_work,
+                args=(pipeline, index, stage, remaining),
+                name=f"pipeline-{stage.name}-{n}",
+            )
+            for n in range(stage.workers)
+        ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        while True:
+            item = pipeline.get(len(stages))
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        pipeline.stop.set()
+        for thread in threads:
+            thread.join()
+    if pipeline.errors:
+        raise pipeline.errors[0]
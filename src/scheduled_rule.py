@@ -12,25 +12,37 @@ Reference:
 """
 
 # pylint: disable=C0103, R0903
-from typing import List, Dict
+from typing import Annotated, List, Dict, Literal
 from enum import Enum
+from types import MappingProxyType
+import functools
 import re
+import sys
 from pydantic import (
     BaseModel,
     Field,
+    PlainSerializer,
     field_validator,
-    field_serializer,
     model_validator,
     ValidationError,
 )
 
+ISO8601_DURATION = re.compile(
+    r"^P(T(?=\d+[HMS])(\d+H)?(\d+M)?(\d+S)?|(\d+D)?(T(\d+H)?(\d+M)?(\d+S)?)?)$",
+    re.IGNORECASE,
+)
+SHORT_DURATION = re.compile(r"(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?")
+
 
 # ISO8601 conversion function
+@functools.lru_cache(maxsize=1024)
 def to_iso8601_duration(value: str) -> str:
     """
     Converts a given duration string into ISO8601 format and validates
     that it falls within a specified range.
 
+    Rules only use a handful of distinct durations, so results are memoized.
+
     Args:
       value (str): duration in days, hours, minutes, and seconds to convert
 
@@ -40,12 +52,10 @@ def to_iso8601_duration(value: str) -> str:
     value = value.strip().lower()
 
     # Already ISO8601?
-    iso8601_regex = r"^P(T(?=\d+[HMS])(\d+H)?(\d+M)?(\d+S)?|(\d+D)?(T(\d+H)?(\d+M)?(\d+S)?)?)$"
-    if re.fullmatch(iso8601_regex, value, re.IGNORECASE):
+    if ISO8601_DURATION.fullmatch(value):
         return value.upper()
 
-    pattern = r"(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?"
-    match = re.fullmatch(pattern, value)
+    match = SHORT_DURATION.fullmatch(value)
     if not match:
         raise ValueError(f"Invalid duration format: '{value}'")
 
@@ -74,6 +84,99 @@ def to_iso8601_duration(value: str) -> str:
     return duration
 
 
+ISO8601_PARTS = re.compile(
+    r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?", re.IGNORECASE
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def duration_minutes(value: str) -> float:
+    """
+    Length in minutes of a duration in either format to_iso8601_duration
+    accepts. Raises ValueError for anything else.
+    """
+    match = ISO8601_PARTS.fullmatch(to_iso8601_duration(value))
+    if match is None:
+        raise ValueError(f"Invalid duration format: '{value}'")
+    days, hours, minutes, seconds = match.groups()
+    return (
+        int(days or 0) * 1440
+        + int(hours or 0) * 60
+        + int(minutes or 0)
+        + int(seconds or 0) / 60
+    )
+
+
+# Duration fields are stored as given and sent to the API as ISO8601
+Duration = Annotated[str, PlainSerializer(to_iso8601_duration, return_type=str)]
+
+
+# triggerOperator spellings accepted from templates and repo YAML
+TRIGGER_OPERATORS = MappingProxyType(
+    {
+        "eq": "Equal",
+        "ne": "NotEqual",
+        "gt": "GreaterThan",
+        "lt": "LessThan",
+        "equals": "Equal",
+        "notequals": "NotEqual",
+        "greaterthan": "GreaterThan",
+        "lessthan": "LessThan",
+        "Equal": "Equal",
+        "NotEqual": "NotEqual",
+        "GreaterThan": "GreaterThan",
+        "LessThan": "LessThan",
+    }
+)
+
+
+def normalize_trigger_operator(value: str | None) -> str | None:
+    """Map a triggerOperator spelling to its API value"""
+    if value is None:
+        return value
+    try:
+        return TRIGGER_OPERATORS[value]
+    except (KeyError, TypeError):
+        raise ValueError(
+            f"Invalid value for triggerOperator: {value}"
+        ) from None
+
+
+@functools.lru_cache(maxsize=4096)
+def split_technique(technique: str) -> tuple[str, str | None]:
+    """
+    Split a technique id into (technique, sub-technique or None), e.g.
+    "T1078.004" -> ("T1078", "T1078.004"). Ids are interned since the same
+    few hundred repeat across every rule.
+    """
+    technique = sys.intern(technique.strip())
+    if "." in technique:
+        return sys.intern(technique.split(".", 1)[0]), technique
+    return technique, None
+
+
+def normalize_techniques(values: dict) -> dict:
+    """
+    Move sub-technique ids out of techniques and into subTechniques,
+    de-duplicating both while keeping their order.
+    """
+    if not isinstance(values, dict) or values.get("techniques") is None:
+        return values
+    techniques = {}
+    sub_techniques = dict.fromkeys(values.pop("subtechniques", None) or ())
+    for tech in values["techniques"]:
+        parent, sub = split_technique(tech)
+        techniques[parent] = None
+        if sub is not None:
+            sub_techniques[sub] = None
+    values["techniques"] = list(techniques)
+    if values.get("subTechniques") is None and (
+        sub_techniques or "subTechniques" in values
+    ):
+        values["subTechniques"] = list(sub_techniques)
+    return values
+
+
 class AlertSeverity(str, Enum):
     """Model"""
 
@@ -211,7 +314,7 @@ class GroupingConfiguration(BaseModel):
     groupByAlertDetails: List[AlertDetail] | None = None
     groupByCustomDetails: List[str] | None = None
     groupByEntities: List[EntityType] | None = None
-    lookbackDuration: str
+    lookbackDuration: Duration
     matchingMethod: MatchingMethod
     reopenClosedIncident: bool
 
@@ -226,11 +329,6 @@ class GroupingConfiguration(BaseModel):
         """validate"""
         return v.strip().lower()
 
-    @field_serializer("lookbackDuration")
-    def serialize_duration(self, v: str) -> str:
-        """validate"""
-        return to_iso8601_duration(v)
-
     @model_validator(mode="before")
     def check_match_data_present(self) -> "GroupingConfiguration":
         """
@@ -308,10 +406,10 @@ class ScheduledAlertRuleProperties(BaseModel):
     displayName: str
     enabled: bool
     query: str
-    queryFrequency: str
-    queryPeriod: str
+    queryFrequency: Duration
+    queryPeriod: Duration
     severity: AlertSeverity
-    suppressionDuration: str = "PT5M"
+    suppressionDuration: Duration = "PT5M"
     suppressionEnabled: bool = False
     triggerOperator: TriggerOperator
     triggerThreshold: int
@@ -333,50 +431,17 @@ class ScheduledAlertRuleProperties(BaseModel):
 
         use_enum_values = True
 
-    @field_serializer("queryFrequency", "queryPeriod", "suppressionDuration")
-    def serialize_duration(self, v: str) -> str:
-        """validate"""
-        return to_iso8601_duration(v)
-
     @model_validator(mode="before")
-    def validate_techniques(self) -> list[str]:
+    @classmethod
+    def validate_techniques(cls, values: dict) -> dict:
         """validate"""
-        validated_techniques = []
-        sub_techniques = []
-        if "techniques" in self and self["techniques"] is not None:
-            for tech in self["techniques"]:
-                if "." in tech:
-                    sub_techniques.append(tech)
-                    validated_techniques.append(tech.split(".")[0])
-                else:
-                    validated_techniques.append(tech)
-            self["techniques"] = list(set(validated_techniques))
-            if "subTechniques" in self and self["subTechniques"] is None:
-                self["subTechniques"] = list(set(sub_techniques))
-            if "subtechniques" in self and self["subtechniques"] is None:
-                self["subTechniques"] = list(set(sub_techniques))
-                self.pop("subtechniques")
-        return self
+        return normalize_techniques(values)
 
     @field_validator("triggerOperator", mode="before")
     @classmethod
     def validate_trigger_operator(cls, value: str) -> str:
         """validate"""
-        mapping = {
-            "eq": "Equal",
-            "ne": "NotEqual",
-            "gt": "GreaterThan",
-            "lt": "LessThan",
-            "equals": "Equal",
-            "notequals": "NotEqual",
-            "greaterthan": "GreaterThan",
-            "lessthan": "LessThan",
-        }
-        if value in mapping:
-            return mapping[value]
-        elif value in mapping.values():
-            return value
-        raise ValidationError(f"Invalid value for triggerOperator: {value}")
+        return normalize_trigger_operator(value)
 
 
 class CreatedByType(str, Enum):
@@ -407,7 +472,7 @@ class SystemData(BaseModel):
 class ScheduledAlertRule(BaseModel):
     """Model"""
 
-    kind: str = Field(default="Scheduled")
+    kind: Literal["Scheduled"] = Field(default="Scheduled")
     properties: ScheduledAlertRuleProperties
     etag: str | None = None
     id: str | None = None
@@ -10,15 +10,13 @@ Reference:
 
 # pylint: disable=C0103, R0903, E0401, E0213
 
-from typing import List, Dict
+from typing import List, Dict, Literal
 from enum import Enum
 from pydantic import (
     BaseModel,
     Field,
     model_validator,
-    field_serializer,
     field_validator,
-    ValidationError,
 )
 import src.scheduled_rule as sr
 
@@ -48,8 +46,8 @@ class ScheduledAlertRuleTemplateProperties(BaseModel):
     entityMappings: List[sr.EntityMapping] | None = None
     eventGroupingSettings: sr.EventGroupingSettings | None = None
     query: str
-    queryFrequency: str
-    queryPeriod: str
+    queryFrequency: sr.Duration
+    queryPeriod: sr.Duration
     requiredDataConnectors: List[AlertRuleTemplateDataSources] | None = None
     severity: sr.AlertSeverity
     status: TemplateStatus | None = None
@@ -65,50 +63,17 @@ class ScheduledAlertRuleTemplateProperties(BaseModel):
 
         use_enum_values = True
 
-    @field_serializer("queryFrequency", "queryPeriod")
-    def serialize_duration(self, v: str) -> str:
-        """validate"""
-        return sr.to_iso8601_duration(v)
-
     @model_validator(mode="before")
-    def validate_techniques(self) -> list[str]:
+    @classmethod
+    def validate_techniques(cls, values: dict) -> dict:
         """validate"""
-        validated_techniques = []
-        sub_techniques = []
-        if "techniques" in self and self["techniques"] is not None:
-            for tech in self["techniques"]:
-                if "." in tech:
-                    sub_techniques.append(tech)
-                    validated_techniques.append(tech.split(".")[0])
-                else:
-                    validated_techniques.append(tech)
-            self["techniques"] = list(set(validated_techniques))
-            if "subTechniques" in self and self["subTechniques"] is None:
-                self["subTechniques"] = list(set(sub_techniques))
-            if "subtechniques" in self and self["subtechniques"] is None:
-                self["subTechniques"] = list(set(sub_techniques))
-                self.pop("subtechniques")
-        return self
+        return sr.normalize_techniques(values)
 
     @field_validator("triggerOperator", mode="before")
     @classmethod
     def validate_trigger_operator(cls, value: str) -> str:
         """validate"""
-        mapping = {
-            "eq": "Equal",
-            "ne": "NotEqual",
-            "gt": "GreaterThan",
-            "lt": "LessThan",
-            "equals": "Equal",
-            "notequals": "NotEqual",
-            "greaterthan": "GreaterThan",
-            "lessthan": "LessThan",
-        }
-        if value in mapping:
-            return mapping[value]
-        elif value in mapping.values():
-            return value
-        raise ValidationError(f"Invalid value for triggerOperator: {value}")
+        return sr.normalize_trigger_operator(value)
 
 
 class ScheduledAlertRuleTemplate(BaseModel):
@@ -118,5 +83,5 @@ class ScheduledAlertRuleTemplate(BaseModel):
     name: str | None = None
     type: str | None = None
     systemData: sr.SystemData | None = None
-    kind: str = Field(default="Scheduled")
+    kind: Literal["Scheduled"] = Field(default="Scheduled")
     properties: ScheduledAlertRuleTemplateProperties
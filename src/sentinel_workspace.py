@@ -5,6 +5,7 @@ This class is used to create a new Sentinel workspace, onboard Microsoft Sentine
 and create alerts in the workspace.
 """
 
+import time
 import uuid
 import requests
 from azure.identity import DefaultAzureCredential, ClientSecretCredential
@@ -12,11 +13,15 @@ import azure.mgmt.securityinsight as si
 import src.app_logging as al
 import src.scheduled_rule as sr
 import src.response_checker as rc
+import src.rule_serialization as rs
 import src.deploy_solutions
 import src.deploy_rules
 
 # pylint: disable=W1203
 
+# uuid5 namespace for rule names derived from workspace and template
+RULE_NAME_NAMESPACE = uuid.UUID("7baec24e-9dc7-414b-9f5b-171f7a3dd47c")
+
 
 class SentinelWorkspace:
     """
@@ -33,6 +38,7 @@ class SentinelWorkspace:
         client_secret=None,
         access_token: str = None,
         token_cache_user_id: str = None,
+        management_url: str = "https://management.azure.com",
     ):
 
         if tenant_id is None or client_id is None or client_secret is None:
@@ -44,6 +50,7 @@ class SentinelWorkspace:
                 client_secret=client_secret,
             )
         self.access_token = access_token
+        self.management_url = management_url.rstrip("/")
         self.rg_api_version = "?api-version=2021-04-01"
         self.ws_api_version = "?api-version=2025-02-01"
         self.sent_api_version = "?api-version=2025-03-01"
@@ -55,7 +62,7 @@ class SentinelWorkspace:
         )
         self.api_version = "?api-version=2025-07-01-preview"
         self.api_url = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/"
             f"providers/Microsoft.OperationalInsights/workspaces/{self.workspace_name}"
             "/providers/Microsoft.SecurityInsights/"
@@ -129,6 +136,56 @@ class SentinelWorkspace:
             response,
         )
 
+    def iter_pages(self, url: str, preamble: str):
+        """Yields the items of a paged list response, following nextLink"""
+        while url:
+            al.logger.debug(f"GET {url}")
+            response = requests.get(url=url, headers=self.headers, timeout=300)
+            page = rc.response_check(preamble, response)
+            if not isinstance(page, dict):
+                return
+            yield from page.get("value", [])
+            url = page.get("nextLink")
+
+    def list_alert_rules(self):
+        """Yields the alert rules in the workspace"""
+        al.logger.info("Listing alert rules")
+        return self.iter_pages(
+            self.api_url + f"alertRules{self.api_version}",
+            f"Error listing alert rules in {self.workspace_name}",
+        )
+
+    def iter_rule_content_templates(self):
+        """Yields rule content templates in the workspace, across pages"""
+        al.logger.info("Listing content templates")
+        return self.iter_pages(
+            self.api_url + f"contentTemplates/{self.api_version}"
+            "&%24filter=(properties%2FcontentKind%20eq%20'AnalyticsRule')"
+            "&$expand=properties/mainTemplate",
+            f"Error listing rule content templates in {self.workspace_name}",
+        )
+
+    def iter_rule_content_metadata(self):
+        """
+        Yields rule content templates without their mainTemplate, just
+        their names, content ids and versions, across pages
+        """
+        al.logger.info("Listing content template metadata")
+        return self.iter_pages(
+            self.api_url + f"contentTemplates/{self.api_version}"
+            "&%24filter=(properties%2FcontentKind%20eq%20'AnalyticsRule')",
+            f"Error listing rule content templates in {self.workspace_name}",
+        )
+
+    def get_rule_content_template(self, name: str):
+        """Gets one content template, mainTemplate included"""
+        resource = self.api_url + f"contentTemplates/{name}{self.api_version}"
+        al.logger.debug(f"GET {resource}")
+        response = requests.get(url=resource, headers=self.headers, timeout=300)
+        return rc.response_check(
+            f"Error getting content template {name}", response
+        )
+
     def get_access_token(self, scope: str):
         """
         Retrieves access token for a specified scope using stored credentials.
@@ -139,7 +196,7 @@ class SentinelWorkspace:
     def create_resoure_group(self, location: str, tags: dict = None):
         """Create a new resource group"""
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}{self.rg_api_version}"
         )
         body = {
@@ -165,7 +222,7 @@ class SentinelWorkspace:
     ):
         """Create a new log analytics workspace"""
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/providers/"
             f"Microsoft.OperationalInsights/workspaces/{self.workspace_name}"
             f"{self.ws_api_version}"
@@ -218,6 +275,108 @@ class SentinelWorkspace:
             f"Error onboarding sentinel to {self.workspace_name}", response
         )
 
+    def delete_log_analytics_workspace(self, force: bool = False):
+        """Delete the log analytics workspace"""
+        resource = (
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
+            f"resourceGroups/{self.resource_group_name}/providers/"
+            f"Microsoft.OperationalInsights/workspaces/{self.workspace_name}"
+            f"{self.ws_api_version}&force={str(force).lower()}"
+        )
+        response = requests.delete(
+            url=resource,
+            headers=self.headers,
+            timeout=300,
+        )
+        return rc.response_check(
+            f"Error deleting {self.workspace_name}", response
+        )
+
+    def delete_resource_group(self):
+        """Delete the resource group and everything in it"""
+        resource = (
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
+            f"resourceGroups/{self.resource_group_name}{self.rg_api_version}"
+        )
+        response = requests.delete(
+            url=resource,
+            headers=self.headers,
+            timeout=300,
+        )
+        return rc.response_check(
+            f"Error deleting {self.resource_group_name}", response
+        )
+
+    @property
+    def resource_group_url(self) -> str:
+        """ARM URL of the resource group, without api-version"""
+        return (
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
+            f"resourceGroups/{self.resource_group_name}"
+        )
+
+    @property
+    def log_analytics_url(self) -> str:
+        """ARM URL of the log analytics workspace, without api-version"""
+        return (
+            f"{self.resource_group_url}/providers/"
+            f"Microsoft.OperationalInsights/workspaces/{self.workspace_name}"
+        )
+
+    def wait_for_provisioning(
+        self,
+        resource: str,
+        preamble: str,
+        timeout: float = 900,
+        interval: float = 5,
+    ):
+        """
+        Poll a resource until its provisioningState is terminal.
+        Returns the resource once it has Succeeded, or False if it Failed,
+        was Canceled, or is still running after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            response = requests.get(
+                url=resource,
+                headers=self.headers,
+                timeout=300,
+            )
+            result = rc.response_check(preamble, response)
+            if result is False:
+                return False
+            state = (
+                result.get("properties", {}).get("provisioningState")
+                if isinstance(result, dict)
+                else None
+            )
+            if state in (None, "Succeeded"):
+                return result
+            if state in ("Failed", "Canceled"):
+                al.logger.error(f"{preamble}: provisioning {state}")
+                return False
+            if time.monotonic() >= deadline:
+                al.logger.error(f"{preamble}: still {state} after {timeout}s")
+                return False
+            al.logger.debug(f"{resource} is {state}, waiting")
+            time.sleep(interval)
+
+    def wait_for_resource_group(self, timeout: float = 900):
+        """Wait until the resource group is provisioned"""
+        return self.wait_for_provisioning(
+            self.resource_group_url + self.rg_api_version,
+            f"Error waiting for {self.resource_group_name}",
+            timeout=timeout,
+        )
+
+    def wait_for_log_analytics_workspace(self, timeout: float = 900):
+        """Wait until the log analytics workspace is provisioned"""
+        return self.wait_for_provisioning(
+            self.log_analytics_url + self.ws_api_version,
+            f"Error waiting for {self.workspace_name}",
+            timeout=timeout,
+        )
+
     def create_sentinel_workspace(self, region: str, tags: dict = None):
         """Create a new workspace"""
         return (
@@ -252,31 +411,62 @@ class SentinelWorkspace:
             x for x in alerts if x.kind == "MicrosoftSecurityIncidentCreation"
         ]
 
+    def rule_name_for_template(self, template_name: str) -> str:
+        """
+        Stable rule name for a template in this workspace.
+        The same template always maps to the same rule, so a retried or
+        repeated deploy updates that rule instead of adding another.
+        Deploys prefer the name of a rule already in the workspace for the
+        template, see deploy_rules.name_rule.
+        """
+        workspace_id = self.log_analytics_url.removeprefix(
+            self.management_url
+        ).lower()
+        return str(
+            uuid.uuid5(RULE_NAME_NAMESPACE, f"{workspace_id}/{template_name}")
+        )
+
     def create_update_alert(
-        self, alert: sr.ScheduledAlertRule, enabled: bool = False
+        self,
+        alert: sr.ScheduledAlertRule,
+        enabled: bool = False,
+        body: bytes = None,
     ):
-        """Create alert in workspace"""
+        """
+        Create alert in workspace.
+        A pre-serialized `body` from rule_serialization is sent as is.
+        """
         al.logger.debug(f"Creating alert: {alert.properties.displayName}")
         if alert.name == alert.properties.alertRuleTemplateName:
-            alert.name = str(uuid.uuid4())
+            alert.name = self.rule_name_for_template(alert.name)
         resource = self.api_url + f"alertRules/{alert.name}{self.api_version}"
-        alert.properties.enabled = enabled
-        body = alert.model_dump()
-        body.pop("id", None)
+        if body is None:
+            body = rs.rule_body(alert, enabled=enabled)
 
         response = requests.put(
             url=resource,
-            json=body,
+            data=body,
             headers=self.headers,
             timeout=300,
         )
-        return rc.response_check(f"Error creating alert {alert.name}", response)
+        return rc.response_check(
+            f"Error creating alert {alert.name}", response
+        )
 
-    def create_update_alerts(self, alerts: list, enabled: bool = False):
-        """Create a list of alerts in the workspace"""
+    def create_update_alerts(
+        self, alerts: list, enabled: bool = False, bodies: list = None
+    ):
+        """
+        Create a list of alerts in the workspace.
+        `bodies`, if given, holds the pre-serialized body for each alert.
+        """
         responses = []
-        for alert in alerts:
-            response = self.create_update_alert(alert, enabled=enabled)
+        for index, alert in enumerate(alerts):
+            response = self.create_update_alert(
+                alert,
+                enabled=enabled,
+                body=bodies[index] if bodies is not None else None,
+            )
             if response is not None:
                 responses.append(response)
         return responses
@@ -284,7 +474,7 @@ class SentinelWorkspace:
     def get_table(self, table_name: str):
         """Get a table from the workspace"""
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/providers/"
             f"Microsoft.OperationalInsights/workspaces/{self.workspace_name}/tables"
             f"/{table_name}{self.ws_api_version}"
@@ -298,10 +488,35 @@ class SentinelWorkspace:
             f"Error creating {self.resource_group_name}", response
         )
 
+    def query_logs(self, query: str, timespan: str = "P1D"):
+        """
+        Run a KQL query over the workspace's logs through the ARM query
+        endpoint. Returns the rows of the primary result, or None on error.
+        """
+        response = requests.post(
+            url=f"{self.log_analytics_url}/api/query?api-version=2020-08-01",
+            headers=self.headers,
+            json={"query": query, "timespan": timespan},
+            timeout=300,
+        )
+        result = rc.response_check(
+            f"Error querying logs in {self.workspace_name}", response
+        )
+        if not isinstance(result, dict) or not result.get("tables"):
+            return None
+        return result["tables"][0].get("rows", [])
+
+    def list_data_connectors(self):
+        """Yields the data connectors in the workspace"""
+        return self.iter_pages(
+            self.api_url + f"dataConnectors{self.api_version}",
+            f"Error listing data connectors in {self.workspace_name}",
+        )
+
     def create_table(self, table_properties: dict):
         """create a table in the workspace"""
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/providers/"
             f"Microsoft.OperationalInsights/workspaces/{self.workspace_name}/tables"
             f"/{table_properties['name']}{self.ws_api_version}"
@@ -320,7 +535,7 @@ class SentinelWorkspace:
         """create a data collection rule"""
 
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/providers/"
             f"Microsoft.Insights/dataCollectionRules/{dcr_name}?api-version=2023-03-11"
         )
@@ -336,7 +551,7 @@ class SentinelWorkspace:
         """create a data collection rule"""
 
         resource = (
-            f"https://management.azure.com/subscriptions/{self.subscription_id}/"
+            f"{self.management_url}/subscriptions/{self.subscription_id}/"
             f"resourceGroups/{self.resource_group_name}/providers/"
             f"Microsoft.Insights/dataCollectionRules/{dcr_name}?api-version=2023-03-11"
         )
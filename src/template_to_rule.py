@@ -6,6 +6,11 @@ import src.nrt_rule as nr
 
 # pylint: disable=W1203, W0718
 
+RULE_MODELS = {
+    "Scheduled": sr.ScheduledAlertRule,
+    "NRT": nr.NrtAlertRule,
+}
+
 
 def translate_template_to_rule(template, enabled: bool = False):
     """Translates a template to a rule"""
@@ -33,3 +38,41 @@ def translate_templates_to_rules(templates, enabled: bool = False):
             )
             continue
     return rules
+
+
+def rule_dict_from_template_dict(template: dict, enabled: bool = False):
+    """Build the raw rule dict for a raw template dict without modeling it"""
+    properties = dict(template["properties"])
+    properties["alertRuleTemplateName"] = template.get("name")
+    properties["templateVersion"] = properties.get("version")
+    properties["enabled"] = enabled
+    return {**template, "properties": properties}
+
+
+def rule_from_template_dict(template: dict, enabled: bool = False):
+    """
+    Translate a raw template dict straight to a rule model.
+
+    Validates once against the rule model instead of modeling the template,
+    dumping it and validating again.
+    """
+    model = RULE_MODELS.get(template.get("kind"))
+    if model is None:
+        raise ValueError(f"Unsupported rule kind: {template.get('kind')}")
+    return model.model_validate(
+        rule_dict_from_template_dict(template, enabled=enabled)
+    )
+
+
+def rules_from_template_dicts(templates: list[dict], enabled: bool = False):
+    """Translate a list of raw template dicts to rule models"""
+    rules = []
+    for template in templates:
+        try:
+            rules.append(rule_from_template_dict(template, enabled=enabled))
+        except Exception as e:
+            al.logger.error(
+                f"Error translating template {template.get('name')} to rule: {e}"
+            )
+            continue
+    return rules
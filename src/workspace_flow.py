@@ -0,0 +1,82 @@
+"""
+Workspace creation as a graph of dependent steps.
+
+Resource group, log analytics workspace and Sentinel onboarding are steps
+that wait for what they depend on. A step only counts as done once ARM
+reports the resource provisioned. A failed run can be resumed by passing
+the steps it completed, which are not run again. Solutions and analytic
+rules are chosen after the workspace exists and deployed by their own
+tasks.
+"""
+
+from typing import Callable
+import src.dag as dag
+
+RESOURCE_GROUP = "resource_group"
+LOG_ANALYTICS = "log_analytics"
+ONBOARD = "onboard"
+
+
+def workspace_steps(
+    workspace,
+    region: str,
+    create_rg: bool = False,
+    create_law: bool = False,
+    onboard: bool = True,
+    tags: dict = None,
+) -> list[dag.Step]:
+    """Build the step graph for one workspace"""
+    steps = []
+    previous = ()
+    if create_rg:
+        steps.append(
+            dag.Step(
+                RESOURCE_GROUP,
+                lambda: workspace.create_resoure_group(region, tags=tags)
+                and workspace.wait_for_resource_group(),
+            )
+        )
+        previous = (RESOURCE_GROUP,)
+    if create_law:
+        steps.append(
+            dag.Step(
+                LOG_ANALYTICS,
+                lambda: workspace.create_log_analytics_workspace(
+                    region, tags=tags
+                )
+                and workspace.wait_for_log_analytics_workspace(),
+                previous,
+            )
+        )
+        previous = (LOG_ANALYTICS,)
+    if onboard:
+        steps.append(dag.Step(ONBOARD, workspace.onboard_sentinel, previous))
+    return steps
+
+
+def run_workspace_flow(
+    workspace,
+    region: str,
+    completed_steps: set[str] = None,
+    on_step: Callable[[dag.StepResult], None] = None,
+    **options,
+) -> dict[str, dag.StepResult]:
+    """
+    Run the workspace step graph, skipping `completed_steps`.
+
+    `options` are passed to workspace_steps. Returns every step's result;
+    the names with status Completed are what to pass back to resume.
+    """
+    steps = workspace_steps(workspace, region, **options)
+    return dag.run_dag(
+        steps, max_workers=4, on_step=on_step, completed=completed_steps
+    )
+
+
+def completed_step_names(results: dict[str, dag.StepResult]) -> list[str]:
+    """Names of the steps that completed, for resuming a later run"""
+    return sorted(
+        name
+        for name, result in results.items()
+        if result.status == dag.COMPLETED
+    )
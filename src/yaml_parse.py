@@ -0,0 +1,136 @@
+"""
+Parse many YAML documents quickly.
+
+Uses libyaml's CSafeLoader when PyYAML was built with it and fans large
+batches out to a process pool in chunks. A document that fails to parse is
+reported in its own result and does not abort the batch.
+
+Documents are read from the input a chunk at a time and results are
+yielded as they come, so a whole archive is never held in memory. The
+process pool lives as long as the process; it is only ever started from
+the main thread, and other threads parse in-process until it exists.
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator
+import yaml
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader
+
+# Below this many documents a process pool costs more than it saves
+MIN_PARALLEL = 64
+# Documents read from the input and sent to the pool at a time
+CHUNK_SIZE = 256
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+@dataclass
+class ParseResult:
+    """Outcome of parsing one document"""
+
+    source: str
+    data: object = None
+    error: str | None = None
+
+
+def load(stream):
+    """yaml.safe_load with the fastest available loader"""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def parse_file(path: str | Path) -> ParseResult:
+    """Parse one YAML file"""
+    try:
+        with open(path, "rb") as f:
+            return ParseResult(str(path), load(f))
+    except (OSError, yaml.YAMLError) as e:
+        return ParseResult(str(path), error=str(e))
+
+
+def parse_blob(item: tuple[str, bytes]) -> ParseResult:
+    """Parse one (name, bytes) YAML document"""
+    name, data = item
+    try:
+        return ParseResult(name, load(data))
+    except yaml.YAMLError as e:
+        return ParseResult(name, error=str(e))
+
+
+def get_pool(workers: int = None) -> ProcessPoolExecutor | None:
+    """
+    The shared process pool, started on first use from the main thread.
+    Returns None when called from another thread before it was started.
+    """
+    global _pool  # pylint: disable=W0603
+    with _pool_lock:
+        if (
+            _pool is None
+            and threading.current_thread() is threading.main_thread()
+        ):
+            _pool = ProcessPoolExecutor(
+                max_workers=workers or os.cpu_count() or 1
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def chunked(items: Iterable, size: int = CHUNK_SIZE) -> Iterator[list]:
+    """Lists of up to `size` items read lazily from `items`"""
+    items = iter(items)
+    while chunk := list(islice(items, size)):
+        yield chunk
+
+
+def _parse_many(
+    func, items: Iterable, workers: int = None, chunksize: int = None
+) -> Iterator:
+    """
+    Apply `func` to `items` in-process or across the shared pool, yielding
+    results in input order. At most two chunks are in flight at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = chunked(items)
+    first = next(chunks, [])
+    pool = None
+    if workers > 1 and len(first) >= MIN_PARALLEL:
+        pool = get_pool(workers)
+    if pool is None:
+        yield from map(func, first)
+        for chunk in chunks:
+            yield from map(func, chunk)
+        return
+    chunksize = chunksize or max(1, CHUNK_SIZE // (workers * 4))
+    pending = deque([pool.map(func, first, chunksize=chunksize)])
+    for chunk in chunks:
+        pending.append(pool.map(func, chunk, chunksize=chunksize))
+        yield from pending.popleft()
+    while pending:
+        yield from pending.popleft()
+
+
+def parse_files(
+    paths: Iterable, workers: int = None, chunksize: int = None
+) -> Iterator[ParseResult]:
+    """Parse YAML files, in input order"""
+    return _parse_many(parse_file, paths, workers, chunksize)
+
+
+def parse_blobs(
+    items: Iterable[tuple[str, bytes]],
+    workers: int = None,
+    chunksize: int = None,
+) -> Iterator[ParseResult]:
+    """Parse (name, bytes) YAML documents, in input order"""
+    return _parse_many(parse_blob, items, workers, chunksize)